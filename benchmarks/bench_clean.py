@@ -0,0 +1,169 @@
+"""
+Benchmark de l'extraction JSON → DataFrame brut de SeLogerDataProcessor.
+
+Les corpus sont reconstruits à partir des data/*_clean.csv (une annonce
+détail SeLoger par ligne, même nombre d'annonces que chaque ville), écrits
+dans un SegmentStore temporaire, puis fusionnés :
+- avant : un DataFrame d'une ligne par annonce + pd.concat (ancien code)
+- après : SeLogerDataProcessor._merge_jsons (dicts + une seule construction)
+- parallèle : idem, ingestion répartie sur un ProcessPoolExecutor
+Le script vérifie aussi que le DataFrame nettoyé est identique.
+
+    python -m benchmarks.bench_clean [data/lyon_clean.csv ...]
+"""
+
+import ast
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from clean_data import SeLogerDataProcessor
+from storage import SegmentStore
+
+
+# -------------------------------------------------------------------------
+# RECONSTRUCTION D'UN CORPUS DÉTAIL DEPUIS UN CSV NETTOYÉ
+# -------------------------------------------------------------------------
+
+def _value(v):
+    return None if pd.isna(v) else v
+
+
+def _literal(v):
+    if pd.isna(v):
+        return None
+    try:
+        return ast.literal_eval(v)
+    except (ValueError, SyntaxError):
+        return None
+
+
+def _iso(v):
+    if pd.isna(v):
+        return None
+    return pd.Timestamp(v).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def corpus_from_clean_csv(csv_path: Path) -> list[dict]:
+    """Une annonce au format détail SeLoger par ligne du CSV nettoyé."""
+    df = pd.read_csv(csv_path)
+    fact_cols = [c for c in df.columns if c.startswith("fact_")]
+    ads = []
+    for row in df.to_dict("records"):
+        facts = [
+            {"type": c[len("fact_"):], "value": row[c]}
+            for c in fact_cols
+            if not pd.isna(row[c])
+        ]
+        price = _value(row.get("price_value"))
+        ads.append({
+            "brand": _value(row.get("brand")),
+            "id": str(row["id"]),
+            "metadata": {
+                "creationDate": _iso(row.get("creation_date")),
+                "updateDate": _iso(row.get("update_date")),
+            },
+            "sections": {
+                "location": {
+                    "address": {
+                        "city": _value(row.get("city")),
+                        "zipCode": None if pd.isna(row.get("zip_code")) else str(int(row["zip_code"])),
+                        "country": _value(row.get("country")),
+                    },
+                    "geometry": {
+                        "type": _value(row.get("geometry_type")),
+                        "coordinates": _literal(row.get("geometry_coords")),
+                    },
+                },
+                "description": {
+                    "description": _value(row.get("description")),
+                    "headline": _value(row.get("headline")),
+                },
+                "hardFacts": {
+                    "title": _value(row.get("title")),
+                    "keyfacts": _literal(row.get("keyfacts")),
+                    "facts": facts,
+                    "price": {"value": None if price is None else f"{price:,.0f} €".replace(",", " ")},
+                },
+            },
+        })
+    return ads
+
+
+# -------------------------------------------------------------------------
+# ANCIENNE IMPLÉMENTATION (référence "avant")
+# -------------------------------------------------------------------------
+
+def legacy_merge(processor: SeLogerDataProcessor, refs) -> pd.DataFrame:
+    dfs = []
+    for p in refs:
+        data = processor._read_json(p)
+        row = {f: processor._deep_get(data, f) for f in processor.fields}
+        df = pd.DataFrame([row])
+        facts = df[processor.unnest].iloc[0]
+        if isinstance(facts, list):
+            for item in facts:
+                if isinstance(item, dict) and item.get("type"):
+                    df[item.get("type")] = item.get("value")
+            for item in facts:
+                if isinstance(item, dict):
+                    df[f"fact_{item.get('type')}"] = item.get("value")
+        df.drop(columns=[processor.unnest], errors="ignore", inplace=True)
+        dfs.append(df)
+    return pd.concat(dfs, ignore_index=True)
+
+
+# -------------------------------------------------------------------------
+# BENCHMARK
+# -------------------------------------------------------------------------
+
+def bench_csv(csv_path: Path, tmp: Path) -> dict:
+    processor = SeLogerDataProcessor()
+    store = SegmentStore(tmp / csv_path.stem)
+    for ad in corpus_from_clean_csv(csv_path):
+        store.put(ad["id"], ad)
+    refs = store.refs()
+
+    t = time.perf_counter()
+    before = legacy_merge(processor, refs)
+    t_before = time.perf_counter() - t
+
+    t = time.perf_counter()
+    after = processor._merge_jsons(refs)
+    t_after = time.perf_counter() - t
+
+    parallel = SeLogerDataProcessor(workers=os.cpu_count(), parallel_threshold=0)
+    t = time.perf_counter()
+    after_par = parallel._merge_jsons(refs)
+    t_par = time.perf_counter() - t
+
+    processor._clean_dataframe(before, tmp / "before.csv")
+    for name, df in (("after", after), ("parallel", after_par)):
+        processor._clean_dataframe(df, tmp / f"{name}.csv")
+        pd.testing.assert_frame_equal(
+            pd.read_csv(tmp / "before.csv"), pd.read_csv(tmp / f"{name}.csv")
+        )
+
+    return {
+        "corpus": csv_path.name,
+        "ads": len(refs),
+        "before_s": round(t_before, 3),
+        "after_s": round(t_after, 3),
+        "parallel_s": round(t_par, 3),
+        "speedup": round(t_before / t_after, 1) if t_after else None,
+    }
+
+
+if __name__ == "__main__":
+    paths = [Path(p) for p in sys.argv[1:]] or sorted(Path("data").glob("*_clean.csv"))
+    with tempfile.TemporaryDirectory(prefix="bench_clean_") as tmp:
+        print(f"{'corpus':<22}{'annonces':>10}{'avant (s)':>12}{'après (s)':>12}"
+              f"{'gain':>8}{'parallèle (s)':>15}")
+        for path in paths:
+            r = bench_csv(path, Path(tmp))
+            print(f"{r['corpus']:<22}{r['ads']:>10}{r['before_s']:>12}{r['after_s']:>12}"
+                  f"{r['speedup']:>7}x{r['parallel_s']:>15}")
@@ -0,0 +1,260 @@
+"""
+Benchmark du pipeline de nettoyage sur des corpus synthétiques
+(benchmarks/corpus.py) de 1k / 10k / 100k / 1M annonces.
+
+Cibles mesurées, chacune dans un sous-processus dédié pour que le pic
+mémoire (ru_maxrss) ne soit pas pollué par la mesure précédente :
+- merge     : SeLogerDataProcessor._merge_jsons (lecture + extraction)
+- clean     : SeLogerDataProcessor._clean_dataframe (nettoyage + export Parquet)
+- run       : run() complet, sans sortie existante
+- run_cached: run() sur une sortie à jour (manifeste), préparée par un
+              premier run() dans un autre sous-processus
+
+Les résultats sont comparés à benchmarks/baselines.json : une durée ou un
+pic RSS au-delà de la tolérance est signalé comme régression (code de
+sortie 1). La sortie est aussi vérifiée, baseline ou non : nombre de
+lignes attendu et part de dates invalides (NaT) sous --max-invalid-dates,
+pour ne pas chronométrer un pipeline qui perd des données. Les corpus générés sont conservés dans --corpus-dir.
+
+    python -m benchmarks.bench_pipeline                      # 1k + 10k
+    python -m benchmarks.bench_pipeline --sizes 100k 1M --targets merge run
+    python -m benchmarks.bench_pipeline --update-baselines
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpus import write_corpus
+
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+TARGETS = ["merge", "clean", "run", "run_cached"]
+BASELINES = Path(__file__).with_name("baselines.json")
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # octets vs Ko
+
+
+def _machine() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(terse=True),
+        "cpus": os.cpu_count(),
+    }
+
+
+# -------------------------------------------------------------------------
+# MESURE (SOUS-PROCESSUS)
+# -------------------------------------------------------------------------
+
+def measure(target: str, corpus: Path, output_dir: Path | None = None) -> dict:
+    """
+    Exécute une cible dans le dossier du corpus (jsons/<ville>/...).
+    La sortie va dans `output_dir` (gardé) ou dans un dossier temporaire.
+    """
+    from clean_data import SeLogerDataProcessor
+
+    os.chdir(corpus)
+    processor = SeLogerDataProcessor()
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as tmp:
+        output = Path(output_dir or tmp) / "cleaned.parquet"
+
+        if target == "merge":
+            refs = processor._list_jsons(None)
+            rss_before = _peak_rss_mb()
+            start = time.perf_counter()
+            df = processor._merge_jsons(refs)
+        elif target == "clean":
+            raw = processor._merge_jsons(processor._list_jsons(None))
+            rss_before = _peak_rss_mb()
+            start = time.perf_counter()
+            df = processor._clean_dataframe(raw, output)
+        elif target == "run":
+            rss_before = _peak_rss_mb()
+            start = time.perf_counter()
+            df = processor.run(output_path=str(output))
+        elif target == "run_cached":
+            if not output.exists():
+                raise FileNotFoundError(f"run_cached : pas de sortie préparée dans {output.parent}")
+            rss_before = _peak_rss_mb()
+            start = time.perf_counter()
+            df = processor.run(output_path=str(output))
+        else:
+            raise ValueError(f"cible inconnue : {target}")
+        seconds = time.perf_counter() - start
+
+    # dates encore brutes (texte) après merge : rien à vérifier
+    invalid_dates = None
+    if target != "merge" and len(df):
+        invalid = df["creation_date"].isna() | df["update_date"].isna()
+        invalid_dates = round(float(invalid.mean()), 4)
+
+    return {
+        "seconds": round(seconds, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "rss_before_mb": round(rss_before, 1),
+        "rows": len(df),
+        "invalid_dates": invalid_dates,
+    }
+
+
+def _run_worker(target: str, corpus: Path, output_dir: Path | None = None) -> dict:
+    cmd = [sys.executable, "-m", "benchmarks.bench_pipeline", "--worker", target, str(corpus)]
+    if output_dir is not None:
+        cmd.append(str(output_dir))
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{target} a échoué :\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure_isolated(target: str, corpus: Path) -> dict:
+    """
+    Lance `measure` dans un nouvel interpréteur et relit son JSON. Pour
+    run_cached, la sortie est d'abord produite par un run() dans un autre
+    interpréteur : le pic RSS mesuré est celui du seul run en cache.
+    """
+    if target != "run_cached":
+        return _run_worker(target, corpus)
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as tmp:
+        _run_worker("run", corpus, Path(tmp))
+        return _run_worker(target, corpus, Path(tmp))
+
+
+# -------------------------------------------------------------------------
+# BASELINES
+# -------------------------------------------------------------------------
+
+def load_baselines(path: Path = BASELINES) -> dict:
+    if not path.exists():
+        return {"machine": None, "results": {}}
+    return json.loads(path.read_text())
+
+
+def compare(result: dict, baseline: dict | None, tolerance: float, rss_tolerance: float,
+            min_delta_s: float = 0.05) -> list[str]:
+    """Régressions d'un résultat par rapport à sa baseline (liste vide sinon)."""
+    if not baseline:
+        return []
+    issues = []
+    base_s = baseline["seconds"]
+    if result["seconds"] > base_s * (1 + tolerance) and result["seconds"] - base_s > min_delta_s:
+        issues.append(f"durée {result['seconds']}s > {base_s}s (+{tolerance:.0%})")
+    base_rss = baseline["peak_rss_mb"]
+    if result["peak_rss_mb"] > base_rss * (1 + rss_tolerance):
+        issues.append(f"RSS {result['peak_rss_mb']} Mo > {base_rss} Mo (+{rss_tolerance:.0%})")
+    return issues
+
+
+def check_output(result: dict, expected_rows: int, max_invalid_dates: float) -> list[str]:
+    """
+    Erreurs de la sortie elle-même (liste vide sinon). Le corpus n'a que
+    des annonces complètes, aux dates ISO valides : toutes doivent sortir.
+    """
+    issues = []
+    if result["rows"] != expected_rows:
+        issues.append(f"{result['rows']} lignes au lieu de {expected_rows}")
+    invalid = result.get("invalid_dates")
+    if invalid is not None and invalid > max_invalid_dates:
+        issues.append(f"{invalid:.1%} de dates invalides > {max_invalid_dates:.1%}")
+    return issues
+
+
+# -------------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------------
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark du nettoyage sur corpus synthétiques.")
+    parser.add_argument("--sizes", nargs="*", default=["1k", "10k"], choices=list(SIZES))
+    parser.add_argument("--targets", nargs="*", default=TARGETS, choices=TARGETS)
+    parser.add_argument("--repeat", type=int, default=1, help="meilleure durée sur N exécutions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus-dir", default=str(Path(tempfile.gettempdir()) / "seloger_bench_corpus"))
+    parser.add_argument("--tolerance", type=float, default=0.25, help="marge de durée tolérée")
+    parser.add_argument("--rss-tolerance", type=float, default=0.15, help="marge de pic RSS tolérée")
+    parser.add_argument("--max-invalid-dates", type=float, default=0.0,
+                        help="part maximale de dates NaT dans la sortie")
+    parser.add_argument("--baselines", default=str(BASELINES))
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--json", default=None, help="écrit les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    baselines = load_baselines(Path(args.baselines))
+    if baselines.get("machine") and baselines["machine"] != _machine():
+        print(f"⚠️ Baselines mesurées sur une autre machine : {baselines['machine']}")
+
+    results, regressions, errors = {}, {}, {}
+    print(f"{'cible':<20}{'annonces':>10}{'s':>10}{'base s':>10}{'pic Mo':>10}{'base Mo':>10}")
+    for label in args.sizes:
+        corpus = Path(args.corpus_dir) / f"{label}_{args.seed}"
+        if not (corpus / "corpus.json").exists():
+            print(f"🧪 Génération du corpus {label} → {corpus}")
+        write_corpus(corpus, SIZES[label], seed=args.seed)
+
+        for target in args.targets:
+            runs = [measure_isolated(target, corpus) for _ in range(max(1, args.repeat))]
+            result = min(runs, key=lambda r: r["seconds"])
+            result["peak_rss_mb"] = min(r["peak_rss_mb"] for r in runs)
+            key = f"{target}@{label}"
+            results[key] = result
+
+            base = baselines["results"].get(key)
+            issues = compare(result, base, args.tolerance, args.rss_tolerance)
+            if issues:
+                regressions[key] = issues
+            wrong = check_output(result, SIZES[label], args.max_invalid_dates)
+            if wrong:
+                errors[key] = wrong
+            flag = "❌" if wrong else "⚠️" if issues else ("✅" if base else "🆕")
+            print(f"{key:<20}{result['rows']:>10}{result['seconds']:>10}"
+                  f"{base['seconds'] if base else '-':>10}{result['peak_rss_mb']:>10}"
+                  f"{base['peak_rss_mb'] if base else '-':>10}  {flag}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(
+            {"machine": _machine(), "results": results, "regressions": regressions,
+             "errors": errors}, indent=2
+        ))
+
+    if errors:
+        # jamais de baseline ni de succès sur une sortie fausse
+        print("\n❌ Sortie incorrecte :")
+        for key, issues in errors.items():
+            print(f"   {key} : " + " ; ".join(issues))
+        return 1
+
+    if args.update_baselines:
+        baselines["machine"] = _machine()
+        baselines["results"].update({
+            k: {"seconds": r["seconds"], "peak_rss_mb": r["peak_rss_mb"]} for k, r in results.items()
+        })
+        Path(args.baselines).write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"💾 Baselines mises à jour -> {args.baselines}")
+        return 0
+
+    if regressions:
+        print("\n❌ Régressions :")
+        for key, issues in regressions.items():
+            print(f"   {key} : " + " ; ".join(issues))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) in (4, 5) and sys.argv[1] == "--worker":
+        output_dir = Path(sys.argv[4]).resolve() if len(sys.argv) == 5 else None
+        print(json.dumps(measure(sys.argv[2], Path(sys.argv[3]).resolve(), output_dir)))
+        sys.exit(0)
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Benchmark de bout en bout du chemin de crawl (run_scraping → HttpClient)
+contre le serveur local benchmarks/fake_seloger.py.
+
+Rapporte annonces/s, latence p50/p99 des requêtes et nombre de retries.
+Le crawl tourne dans un dossier temporaire : jsons/ et cookies/ du projet
+ne sont pas touchés.
+
+    python -m benchmarks.bench_scraping --ads 300 --rate 20 --workers 8
+    python -m benchmarks.bench_scraping --p429 0.05 --p403 0.01 --json out.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.fake_seloger import (
+    FakeConfig,
+    FakeSeLogerServer,
+    load_recorded_corpus,
+    location_id_for,
+    synthetic_corpus,
+)
+from cookie_manager import get_cookie_manager
+from rate_limiter import AdaptiveRateLimiter
+from scrapper import CancelToken, RequestMetrics, run_scraping
+
+
+def run_benchmark(
+    corpus,
+    config: FakeConfig,
+    rate: float,
+    max_rate: float,
+    workers: int,
+    size: int,
+    max_page: int,
+) -> dict:
+    server = FakeSeLogerServer(corpus, config).start()
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_scraping_") as tmp:
+            os.chdir(tmp)
+
+            # cookie factice + refresh sans navigateur
+            Path("cookies").mkdir()
+            Path("cookies/seloger_cookies.json").write_text('[{"name": "bench", "value": "1"}]')
+            get_cookie_manager("cookies/seloger_cookies.json").refresh_cmd = [sys.executable, "-c", "pass"]
+
+            metrics = RequestMetrics()
+            limiter = AdaptiveRateLimiter(rate=rate, max_rate=max_rate, burst=workers)
+            cities = {city: location_id_for(city) for city in corpus}
+
+            stats, elapsed = run_scraping(
+                cities,
+                size=size,
+                max_page=max_page,
+                max_workers=workers,
+                cancel=CancelToken(flag_path=Path(tmp) / "stop_scraping.flag"),
+                rate_limiter=limiter,
+                base_url=server.base_url,
+                metrics=metrics,
+            )
+    finally:
+        os.chdir(cwd)
+        server.stop()
+
+    ads = sum(s["ads"] for s in stats.values())
+    return {
+        "cities": len(corpus),
+        "ads": ads,
+        "elapsed_s": round(elapsed, 2),
+        "ads_per_s": round(ads / elapsed, 2) if elapsed else None,
+        **metrics.summary(),
+        "server": server.counters,
+        "stats": stats,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark run_scraping contre un faux SeLoger.")
+    parser.add_argument("--jsons", default=None, help="rejouer un corpus enregistré (sinon synthétique)")
+    parser.add_argument("--cities", nargs="*", default=["lyon", "marseille"])
+    parser.add_argument("--ads", type=int, default=300, help="annonces synthétiques par ville")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--p403", type=float, default=0.0)
+    parser.add_argument("--p429", type=float, default=0.0)
+    parser.add_argument("--p500", type=float, default=0.0)
+    parser.add_argument("--ptimeout", type=float, default=0.0)
+    parser.add_argument("--stall", type=float, default=2.0)
+    parser.add_argument("--rate", type=float, default=20.0, help="débit initial (req/s)")
+    parser.add_argument("--max-rate", type=float, default=50.0)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--size", type=int, default=30)
+    parser.add_argument("--max-page", type=int, default=999)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="écrit le rapport dans ce fichier")
+    args = parser.parse_args()
+
+    corpus = load_recorded_corpus(Path(args.jsons)) if args.jsons else {}
+    if not corpus:
+        corpus = synthetic_corpus(args.cities, args.ads, seed=args.seed)
+
+    config = FakeConfig(
+        latency=args.latency, jitter=args.jitter, p403=args.p403, p429=args.p429,
+        p500=args.p500, ptimeout=args.ptimeout, stall=args.stall, seed=args.seed,
+    )
+    report = run_benchmark(
+        corpus, config, args.rate, args.max_rate, args.workers, args.size, args.max_page
+    )
+
+    print("\n" + "=" * 60)
+    print(f"🏁 {report['ads']} annonces en {report['elapsed_s']}s → {report['ads_per_s']} annonces/s")
+    print(f"   requêtes : {report['requests']} | p50 {report['latency_p50_ms']} ms"
+          f" | p99 {report['latency_p99_ms']} ms")
+    print(f"   retries  : {report['retries'] or 0}")
+    print("=" * 60)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,276 @@
+"""
+Générateur de corpus synthétique au format détail SeLoger, pour mesurer
+SeLogerDataProcessor à 1k / 10k / 100k / 1M annonces.
+
+Reprend la variété des annonces enregistrées (data/*_clean.csv) :
+- facts en texte ("41,81 m²", "3 pièces", "Étage 2/5", "5 000 m² de terrain")
+  et parfois déjà numériques (int / float)
+- géométries Point, Polygon et MultiPolygon (50 à 500 sommets), parfois absentes
+- prix "1 250 €", "1250 € CC" ou numérique
+- descriptions de ~1 200 caractères, ~3 % de republications (quasi-doublons)
+- quelques annonces illisibles (JSON tronqué) en option
+
+    python -m benchmarks.corpus /tmp/corpus --ads 100000
+"""
+
+import json
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+from storage import SegmentStore
+
+
+CITIES = {
+    # slug : (nom SeLoger, code postal de base, lat, lon, arrondissements)
+    "lyon": ("Lyon", 69000, 45.760, 4.835, 9),
+    "marseille": ("Marseille", 13000, 43.296, 5.370, 16),
+    "paris": ("Paris", 75000, 48.857, 2.352, 20),
+    "nice": ("Nice", 6000, 43.703, 7.266, 0),
+    "annecy": ("Annecy", 74000, 45.899, 6.129, 0),
+}
+
+TITLES = [
+    ("Appartement à louer", 0.80),
+    ("Studio à louer", 0.07),
+    ("Appartement à louer - logement étudiant", 0.04),
+    ("Duplex à louer", 0.03),
+    ("Maison à louer", 0.03),
+    ("Loft à louer", 0.03),
+]
+
+WORDS = (
+    "appartement lumineux calme proche commerces transports métro tram école "
+    "séjour cuisine équipée aménagée salle de bains douche wc séparés chambre "
+    "placard rangements balcon terrasse vue dégagée parquet double vitrage "
+    "chauffage individuel collectif gaz électrique charges comprises dépôt "
+    "garantie honoraires locataire disponible immédiatement meublé non "
+    "résidence sécurisée gardien ascenseur cave parking box étage rénové "
+    "récemment quartier recherché centre ville gare université parc "
+    "visite virtuelle dossier complet garant contactez agence"
+).split()
+
+EPOCH = datetime(2025, 12, 15, tzinfo=timezone.utc)
+
+
+# -------------------------------------------------------------------------
+# CHAMPS
+# -------------------------------------------------------------------------
+
+def _nbsp_thousands(value: int, sep: str = " ") -> str:
+    return f"{value:,}".replace(",", sep)
+
+
+def _surface_text(rng: random.Random, surface: float) -> Any:
+    r = rng.random()
+    if r < 0.10:
+        return round(surface)                    # déjà numérique
+    if r < 0.55:
+        return f"{surface:.2f}".rstrip("0").rstrip(".").replace(".", ",") + " m²"
+    return f"{round(surface)} m²"
+
+
+def _floor_text(rng: random.Random) -> str:
+    floors = rng.randint(1, 9)
+    floor = rng.randint(0, floors)
+    r = rng.random()
+    if floor == 0:
+        return "RDC"
+    if r < 0.5:
+        return f"Étage {floor}/{floors}"
+    return "1er étage" if floor == 1 else f"{floor}ème étage"
+
+
+def _price_text(rng: random.Random, price: int) -> Any:
+    r = rng.random()
+    if r < 0.10:
+        return price
+    if r < 0.70:
+        return f"{_nbsp_thousands(price, chr(160))} €"
+    return f"{price} € CC"
+
+
+def _ring(rng: random.Random, lon: float, lat: float, n: int, radius: float) -> list:
+    pts = []
+    for k in range(n):
+        a = 2 * math.pi * k / n
+        r = radius * (0.7 + 0.3 * rng.random())
+        pts.append([round(lon + r * math.cos(a), 6), round(lat + 0.7 * r * math.sin(a), 6)])
+    pts.append(pts[0])
+    return pts
+
+
+def _geometry(rng: random.Random, lon: float, lat: float) -> Dict[str, Any] | None:
+    r = rng.random()
+    if r < 0.01:
+        return None
+    if r < 0.70:
+        return {"type": "Point", "coordinates": [lon, lat]}
+    if r < 0.75:
+        return {"type": "Polygon", "coordinates": [_ring(rng, lon, lat, rng.randint(50, 200), 0.01)]}
+    parts = rng.choice((1, 1, 1, 2))
+    return {
+        "type": "MultiPolygon",
+        "coordinates": [
+            [_ring(rng, lon + 0.01 * p, lat, rng.randint(50, 250), 0.01)] for p in range(parts)
+        ],
+    }
+
+
+def _description(rng: random.Random, rooms: int, surface: float, city: str) -> str:
+    body = " ".join(rng.choices(WORDS, k=rng.randint(60, 260)))
+    return (
+        f"{city} - appartement {rooms} pièces de {round(surface)} m².\r\n\r\n"
+        f"{body.capitalize()}.\r\n\r\nContactez l'agence pour organiser une visite."
+    )
+
+
+def _iso(dt: datetime, rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{rng.randint(0, 999):03d}Z"
+
+
+# -------------------------------------------------------------------------
+# ANNONCES
+# -------------------------------------------------------------------------
+
+def generate_ad(rng: random.Random, slug: str, i: int) -> Dict[str, Any]:
+    """Une annonce détail réaliste pour la ville `slug`."""
+    name, zip_base, lat0, lon0, districts = CITIES[slug]
+    district = rng.randint(1, districts) if districts else 0
+    city = f"{name} {district}{'er' if district == 1 else 'ème'}" if district else name
+    zip_code = f"{zip_base + district:05d}"
+
+    rooms = rng.choices((1, 2, 3, 4, 5), weights=(20, 35, 25, 13, 7))[0]
+    surface = max(9.0, rng.gauss(18 + 17 * rooms, 6))
+    price = int(surface * rng.uniform(11, 30))
+    lat = round(lat0 + rng.gauss(0, 0.02), 6)
+    lon = round(lon0 + rng.gauss(0, 0.03), 6)
+
+    created = EPOCH - timedelta(minutes=rng.randint(0, 60 * 24 * 120))
+    updated = created + timedelta(minutes=rng.randint(0, 60 * 24 * 20))
+
+    bedrooms = max(0, rooms - 1)
+    facts = [
+        {"type": "numberOfRooms", "value": rooms if rng.random() < 0.1 else f"{rooms} pièce{'s' if rooms > 1 else ''}"},
+        {"type": "livingSpace", "value": _surface_text(rng, surface)},
+    ]
+    if bedrooms and rng.random() < 0.8:
+        facts.insert(1, {"type": "numberOfBedrooms", "value": f"{bedrooms} chambre{'s' if bedrooms > 1 else ''}"})
+    if rng.random() < 0.9:
+        facts.append({"type": "numberOfFloors", "value": _floor_text(rng)})
+    if rng.random() < 0.07:
+        day = EPOCH + timedelta(days=rng.randint(0, 30))
+        facts.append({"type": "availability", "value": f"dès le {day:%d/%m/%Y}"})
+    if rng.random() < 0.01:
+        facts.append({"type": "plotSpace", "value": f"{_nbsp_thousands(rng.randint(1, 60) * 100)} m² de terrain"})
+
+    title = rng.choices([t for t, _ in TITLES], weights=[w for _, w in TITLES])[0]
+    return {
+        "brand": "seloger",
+        "id": f"{slug[:2].upper()}{i:010d}",
+        "metadata": {"creationDate": _iso(created, rng), "updateDate": _iso(updated, rng)},
+        "sections": {
+            "location": {
+                "address": {"city": city, "zipCode": zip_code, "country": "FRA"},
+                "geometry": _geometry(rng, lon, lat),
+            },
+            "description": {
+                "description": _description(rng, rooms, surface, city),
+                "headline": f"{rooms} pièces" if rng.random() < 0.5 else None,
+            },
+            "hardFacts": {
+                "title": title,
+                "keyfacts": [str(f["value"]) for f in facts[:4]],
+                "facts": facts,
+                "price": {"value": _price_text(rng, price)},
+            },
+        },
+    }
+
+
+def _relist(rng: random.Random, ad: Dict[str, Any], new_id: str) -> Dict[str, Any]:
+    """Même bien republié : nouvel id, prix légèrement modifié."""
+    copy = json.loads(json.dumps(ad))
+    copy["id"] = new_id
+    price = copy["sections"]["hardFacts"]["price"]
+    raw = price["value"]
+    value = raw if isinstance(raw, int) else int("".join(ch for ch in str(raw) if ch.isdigit()))
+    price["value"] = f"{int(value * rng.uniform(0.97, 1.03))} €"
+    return copy
+
+
+def generate_corpus(
+    n: int,
+    cities=("lyon", "marseille", "paris"),
+    seed: int = 0,
+    relist_rate: float = 0.03,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(ville, annonce) × n, répartis entre les villes, reproductible via `seed`."""
+    rng = random.Random(seed)
+    recent: list[Tuple[str, Dict[str, Any]]] = []
+    for i in range(n):
+        if recent and rng.random() < relist_rate:
+            slug, source = rng.choice(recent)
+            ad = _relist(rng, source, f"{slug[:2].upper()}R{i:09d}")
+        else:
+            slug = cities[i % len(cities)]
+            ad = generate_ad(rng, slug, i)
+            if len(recent) < 500:
+                recent.append((slug, ad))
+            else:
+                recent[rng.randrange(500)] = (slug, ad)
+        yield slug, ad
+
+
+def write_corpus(
+    root: Path,
+    n: int,
+    cities=("lyon", "marseille", "paris"),
+    seed: int = 0,
+    invalid_rate: float = 0.0,
+) -> Path:
+    """
+    Écrit le corpus sous <root>/jsons/<ville>/ (SegmentStore). Réutilisé
+    tel quel si déjà généré avec les mêmes paramètres (<root>/corpus.json).
+    """
+    root = Path(root)
+    params = {"n": n, "cities": list(cities), "seed": seed, "invalid_rate": invalid_rate}
+    marker = root / "corpus.json"
+    if marker.exists() and json.loads(marker.read_text()) == params:
+        return root
+
+    stores = {slug: SegmentStore(root / "jsons" / slug) for slug in cities}
+    rng = random.Random(seed + 1)
+    for k, (slug, ad) in enumerate(generate_corpus(n, cities, seed)):
+        if invalid_rate and rng.random() < invalid_rate:
+            # annonce illisible : ancien format, JSON tronqué
+            legacy = stores[slug].legacy_dir
+            legacy.mkdir(parents=True, exist_ok=True)
+            (legacy / f"{ad['id']}.json").write_text(json.dumps(ad)[:200])
+            continue
+        stores[slug].put(ad["id"], ad)
+        if (k + 1) % 100_000 == 0:
+            print(f"   … {k + 1} annonces écrites")
+    marker.write_text(json.dumps(params))
+    return root
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Génère un corpus SeLoger synthétique.")
+    parser.add_argument("root")
+    parser.add_argument("--ads", type=int, default=10_000)
+    parser.add_argument("--cities", nargs="*", default=["lyon", "marseille", "paris"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    write_corpus(Path(args.root), args.ads, tuple(args.cities), args.seed, args.invalid_rate)
+    print(f"🧪 {args.ads} annonces → {args.root}/jsons en {time.perf_counter() - start:.1f}s")
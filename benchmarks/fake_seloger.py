@@ -0,0 +1,299 @@
+"""
+Serveur local qui imite les endpoints SeLoger utilisés par le scraper :
+
+    POST /serp-bff/search                 (pagination + tri)
+    GET  /cdp-bff/v1/classified/{id}      (détail d'une annonce)
+    POST /search-mfe-bff/autocomplete     (id de location)
+
+Il rejoue les annonces enregistrées sous jsons/<ville>/ (segments ou ancien
+format) ou, à défaut, un corpus synthétique. Latence et erreurs (403, 429,
+timeouts) sont injectables pour mesurer le comportement du chemin de crawl.
+
+    python -m benchmarks.fake_seloger --port 8765 --latency 0.1 --p429 0.05
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+from storage import open_city_stores
+
+
+# -------------------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------------------
+
+@dataclass
+class FakeConfig:
+    latency: float = 0.1          # latence moyenne (s)
+    jitter: float = 0.05          # ± variation uniforme (s)
+    p403: float = 0.0             # probabilité de 403 (cookie expiré)
+    p429: float = 0.0             # probabilité de 429
+    p500: float = 0.0             # probabilité de 503
+    ptimeout: float = 0.0         # probabilité de ne jamais répondre
+    stall: float = 5.0            # durée d'un "timeout" côté serveur (s)
+    retry_after: float | None = 1.0  # Retry-After envoyé avec les 429
+    seed: int | None = None
+
+
+# -------------------------------------------------------------------------
+# CORPUS
+# -------------------------------------------------------------------------
+
+def location_id_for(city: str) -> str:
+    return f"FAKE_{city}"
+
+
+def load_recorded_corpus(root: Path = Path("jsons")) -> Dict[str, List[Dict[str, Any]]]:
+    """Annonces enregistrées par ville (via SegmentStore)."""
+    corpus = {}
+    for store in open_city_stores(None, root):
+        ads = [data for _, data in store]
+        if ads:
+            corpus[store.base.name] = ads
+    return corpus
+
+
+def synthetic_corpus(cities: List[str], ads_per_city: int, seed: int = 0) -> Dict[str, List[Dict[str, Any]]]:
+    """Corpus minimal au format détail SeLoger, pour tourner sans données."""
+    rng = random.Random(seed)
+    now = datetime(2025, 12, 1, tzinfo=timezone.utc)
+    corpus = {}
+    for city in cities:
+        ads = []
+        for i in range(ads_per_city):
+            updated = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+            surface = rng.randint(15, 140)
+            ads.append({
+                "brand": "seloger",
+                "id": f"{city[:3].upper()}{i:08d}",
+                "metadata": {
+                    "creationDate": (updated - timedelta(days=rng.randint(0, 30))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "updateDate": updated.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                },
+                "sections": {
+                    "location": {
+                        "address": {"country": "FRA", "city": city.title(), "zipCode": "69001"},
+                        "geometry": {
+                            "type": "Point",
+                            "coordinates": [4.8 + rng.random() / 10, 45.7 + rng.random() / 10],
+                        },
+                    },
+                    "hardFacts": {
+                        "title": "Appartement à louer",
+                        "price": {"value": f"{surface * rng.randint(12, 25)} €"},
+                        "facts": [
+                            {"type": "livingSpace", "value": f"{surface} m²"},
+                            {"type": "numberOfRooms", "value": f"{max(1, surface // 25)} pièces"},
+                        ],
+                    },
+                },
+            })
+        corpus[city] = ads
+    return corpus
+
+
+# -------------------------------------------------------------------------
+# SERVEUR
+# -------------------------------------------------------------------------
+
+class FakeSeLogerServer:
+    """Serveur HTTP threadé démarré en tâche de fond (start/stop)."""
+
+    DETAIL_RE = re.compile(r"^/cdp-bff/v1/classified/([^/?]+)")
+
+    def __init__(
+        self,
+        corpus: Dict[str, List[Dict[str, Any]]],
+        config: FakeConfig | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.config = config or FakeConfig()
+        self.rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+
+        self.by_location = {location_id_for(c): ads for c, ads in corpus.items()}
+        self.by_id = {str(ad["id"]): ad for ads in corpus.values() for ad in ads}
+        self.cities = list(corpus)
+
+        self.counters: Dict[str, int] = {}
+        self._counters_lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeSeLogerServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    # ---- helpers ----
+    def _count(self, key: str) -> None:
+        with self._counters_lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def _draw(self) -> tuple[float, str | None]:
+        """Tire la latence et l'éventuelle erreur injectée pour une requête."""
+        cfg = self.config
+        with self._rng_lock:
+            latency = max(0.0, cfg.latency + self.rng.uniform(-cfg.jitter, cfg.jitter))
+            r = self.rng.random()
+        for fault, p in (("timeout", cfg.ptimeout), ("403", cfg.p403), ("429", cfg.p429), ("503", cfg.p500)):
+            if r < p:
+                return latency, fault
+            r -= p
+        return latency, None
+
+    def search(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        place_ids = body.get("criteria", {}).get("location", {}).get("placeIds", [])
+        ads = self.by_location.get(place_ids[0] if place_ids else "", [])
+        paging = body.get("paging", {})
+        page, size = int(paging.get("page", 1)), int(paging.get("size", 30))
+        if paging.get("order") == "DateDesc":
+            ads = sorted(ads, key=lambda a: a["metadata"]["updateDate"], reverse=True)
+        chunk = ads[(page - 1) * size: page * size]
+        return {
+            "classifieds": [
+                {"id": ad["id"], "metadata": {"updateDate": ad["metadata"].get("updateDate")}}
+                for ad in chunk
+            ],
+            "totalCount": len(ads),
+        }
+
+    def autocomplete(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        text = str(body.get("text", "")).strip().lower()
+        return [
+            {"id": location_id_for(c), "labels": [c]}
+            for c in self.cities
+            if c.lower().startswith(text)
+        ]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: Any, headers: Dict[str, str] | None = None):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b"{}"
+                try:
+                    return json.loads(raw or b"{}")
+                except ValueError:
+                    return {}
+
+            def _faults(self, endpoint: str) -> bool:
+                """Applique latence + erreur injectée, True si déjà répondu."""
+                server._count(endpoint)
+                latency, fault = server._draw()
+                if fault == "timeout":
+                    server._count(f"{endpoint}:timeout")
+                    time.sleep(server.config.stall)
+                    self.close_connection = True
+                    return True
+                time.sleep(latency)
+                if fault == "403":
+                    server._count(f"{endpoint}:403")
+                    self._send(403, {"error": "forbidden"})
+                    return True
+                if fault == "429":
+                    server._count(f"{endpoint}:429")
+                    headers = {}
+                    if server.config.retry_after is not None:
+                        headers["Retry-After"] = f"{server.config.retry_after:g}"
+                    self._send(429, {"error": "too many requests"}, headers)
+                    return True
+                if fault == "503":
+                    server._count(f"{endpoint}:503")
+                    self._send(503, {"error": "unavailable"})
+                    return True
+                return False
+
+            def do_GET(self):
+                match = server.DETAIL_RE.match(self.path)
+                if not match:
+                    self._send(404, {"error": "not found"})
+                    return
+                if self._faults("detail"):
+                    return
+                ad = server.by_id.get(match.group(1))
+                if ad is None:
+                    self._send(404, {"error": "unknown classified"})
+                else:
+                    self._send(200, ad)
+
+            def do_POST(self):
+                body = self._body()
+                if self.path.startswith("/serp-bff/search"):
+                    if not self._faults("search"):
+                        self._send(200, server.search(body))
+                elif self.path.startswith("/search-mfe-bff/autocomplete"):
+                    if not self._faults("autocomplete"):
+                        self._send(200, server.autocomplete(body))
+                else:
+                    self._send(404, {"error": "not found"})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serveur SeLoger local pour benchmarks.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--jsons", default="jsons", help="corpus enregistré à rejouer")
+    parser.add_argument("--synthetic", type=int, default=0, help="annonces synthétiques par ville si pas de corpus")
+    parser.add_argument("--cities", nargs="*", default=["lyon", "marseille"])
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--p403", type=float, default=0.0)
+    parser.add_argument("--p429", type=float, default=0.0)
+    parser.add_argument("--p500", type=float, default=0.0)
+    parser.add_argument("--ptimeout", type=float, default=0.0)
+    args = parser.parse_args()
+
+    corpus = load_recorded_corpus(Path(args.jsons))
+    if not corpus:
+        corpus = synthetic_corpus(args.cities, args.synthetic or 300)
+    config = FakeConfig(
+        latency=args.latency, jitter=args.jitter, p403=args.p403,
+        p429=args.p429, p500=args.p500, ptimeout=args.ptimeout,
+    )
+    server = FakeSeLogerServer(corpus, config, port=args.port)
+    print(f"🧪 Faux SeLoger sur {server.base_url} : {sum(map(len, corpus.values()))} annonces "
+          f"({', '.join(f'{c} → {location_id_for(c)}' for c in corpus)})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -1,9 +1,38 @@
 import ast
 import json
+import os
+import shutil
+import time
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-from shapely.geometry import shape
+import shapely
+
+from dedup import NearDuplicateIndex, assign_clusters
+from pipeline_report import PipelineReport
+from spatial_grid import build_grid, save_grid
+from storage import SegmentRef, atomic_write_text, open_city_stores, read_segment_record
+from summary import SUMMARY_COLUMNS, load_summary, save_summary, summarize
+
+# Décodeur JSON plus rapide si disponible (optionnel)
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+# Noms GeoJSON canoniques (from_geojson est sensible à la casse)
+_GEOJSON_TYPES = {
+    t.lower(): t for t in (
+        "Point", "MultiPoint", "LineString", "MultiLineString",
+        "Polygon", "MultiPolygon", "GeometryCollection",
+    )
+}
 
 
 class SeLogerDataProcessor:
@@ -12,8 +41,20 @@ class SeLogerDataProcessor:
     # ------------------------------------------------------------------
     # INITIALISATION
     # ------------------------------------------------------------------
-    def __init__(self):
-        """Définit une fois pour toutes les configurations du pipeline."""
+    def __init__(self, workers=None, parallel_threshold=5000, near_dedup=True):
+        """
+        Définit une fois pour toutes les configurations du pipeline.
+        workers : nombre de process pour l'ingestion JSON (None = nb de
+        cœurs), utilisés seulement au-delà de `parallel_threshold` annonces.
+        near_dedup : ajoute la colonne dup_cluster (quasi-doublons, dedup.py).
+        """
+
+        self.workers = workers
+        self.parallel_threshold = parallel_threshold
+        self.near_dedup = near_dedup
+
+        # Instrumentation de la dernière exécution (voir pipeline_report.py)
+        self.report = PipelineReport()
 
         # Colonnes catégorielles
         self.cat_cols = [
@@ -53,13 +94,37 @@ class SeLogerDataProcessor:
         # Champ qui contient la liste à désimbriquer
         self.unnest = "sections.hardFacts.facts"
 
+        # Chemins 'a.b.c' découpés une fois pour toutes (_extract_fields)
+        self._field_paths = [(field, tuple(field.split("."))) for field in self.fields]
+
+        # Schéma fixe de la sortie Parquet (colonnes des facts hors schéma
+        # → texte brut). Les coordonnées (profondeur variable selon le type
+        # de géométrie) sont stockées en GeoJSON et relues en listes.
+        category = pa.dictionary(pa.int32(), pa.string())
+        date = pa.timestamp("ns", tz="UTC")
+        self.schema = pa.schema(
+            [("id", pa.string())]
+            + [(c, date) for c in ("creation_date", "update_date")]
+            + [(c, category) for c in self.cat_cols]
+            + [
+                ("geometry_coords", pa.string()),
+                ("description", pa.string()),
+                ("keyfacts", pa.list_(pa.string())),
+            ]
+            + [(c, pa.float64()) for c in self.num_cols + ["lon", "lat", "price_m2"]]
+            + [("dup_cluster", pa.int64())]
+        )
+
     # ------------------------------------------------------------------
     # FONCTIONS GÉNÉRALES
     # ------------------------------------------------------------------
     @staticmethod
     def _read_json(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        """Lit une annonce : référence vers un segment ou ancien fichier JSON."""
+        if isinstance(path, SegmentRef):
+            return read_segment_record(path, loads=_json_loads)
+        with open(path, "rb") as f:
+            return _json_loads(f.read())
 
     @staticmethod
     def _deep_get(d, key_path):
@@ -72,142 +137,494 @@ class SeLogerDataProcessor:
                 return None
         return d
 
+    def _extract_fields(self, data):
+        """
+        Champs simples d'une annonce via les chemins découpés une fois
+        (self._field_paths) : pas de re-split par annonce. Champ absent →
+        None, comme _deep_get.
+        """
+        row = {}
+        for field, keys in self._field_paths:
+            d = data
+            for key in keys:
+                d = d.get(key) if isinstance(d, dict) else None
+                if d is None:
+                    break
+            row[field] = d
+        return row
+
     # ------------------------------------------------------------------
-    # EXTRACTION JSON → DataFrame
+    # EXTRACTION JSON → enregistrement (dict)
     # ------------------------------------------------------------------
-    def _json_to_df(self, json_path):
-        data = self._read_json(json_path)
+    def _json_to_record(self, json_path):
+        return self._record_from_data(self._read_json(json_path))
 
-        # Extraction simple
-        row = {f: self._deep_get(data, f) for f in self.fields}
-        df = pd.DataFrame([row])
+    def _record_from_data(self, data):
+        """
+        Une annonce → un dict plat. Les facts deviennent des colonnes
+        <type> puis fact_<type>, dans le même ordre que l'ancien _json_to_df.
+        """
+        # Extraction simple (chemins pré-découpés, champs absents → None)
+        if isinstance(data, dict):
+            row = self._extract_fields(data)
+        else:
+            row = dict.fromkeys(self.fields)
 
-        # Désimbriquer les facts
-        # Désimbriquer les facts
-        facts = df[self.unnest].iloc[0]
+        # Désimbriquer les facts en un seul passage
+        facts = row.pop(self.unnest, None)
 
         if isinstance(facts, list):
+            typed, raw = {}, {}
             for item in facts:
                 if isinstance(item, dict):
                     fact_type = item.get("type")
-                    fact_value = item.get("value")
-
+                    value = item.get("value")
                     if fact_type:
-                        df[fact_type] = fact_value 
-
-        if isinstance(facts, list):
-            for item in facts:
-                if isinstance(item, dict):
-                    df[f"fact_{item.get('type')}"] = item.get("value")
+                        typed[fact_type] = value
+                    raw[f"fact_{fact_type}"] = value
+            row.update(typed)
+            row.update(raw)
 
-        df.drop(columns=[self.unnest], errors="ignore", inplace=True)
+        return row
 
-        return df
+    def _json_to_df(self, json_path):
+        return pd.DataFrame([self._json_to_record(json_path)])
 
     # ------------------------------------------------------------------
     # COLLECTE DES JSON
     # ------------------------------------------------------------------
     def _list_jsons(self, city_name):
-        """Récupère la liste des JSON pour une ville ou toutes les villes."""
+        """
+        Récupère les références des annonces pour une ville ou toutes les
+        villes (segments compressés + anciens fichiers non migrés).
+        """
 
         if city_name:
-            folder = Path(f"jsons/{city_name.lower()}/annonces")
+            folder = Path(f"jsons/{city_name.lower()}")
             if not folder.exists():
                 print(f"⚠️ Dossier {folder} introuvable")
                 return []
-            return list(folder.glob("*.json"))
 
-        # ALL CITIES MODE
-        root = Path("jsons")
-        all_jsons = []
-        for city_dir in root.iterdir():
-            annonces = city_dir / "annonces"
-            if annonces.exists():
-                all_jsons.extend(annonces.glob("*.json"))
-        return all_jsons
+        # city_name=None → ALL CITIES MODE
+        refs = []
+        for store in open_city_stores(city_name):
+            refs.extend(store.refs())
+        return refs
+
+
+    # ------------------------------------------------------------------
+    # MANIFESTE (nettoyage incrémental)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _ref_id(ref):
+        return ref.ad_id if isinstance(ref, SegmentRef) else Path(ref).stem
+
+    @staticmethod
+    def _signature(ref):
+        """
+        Version d'une annonce. Les segments sont en ajout seul : une annonce
+        re-scrapée change de position, pas besoin de stat. Les anciens
+        fichiers JSON sont versionnés par mtime + taille.
+        """
+        if isinstance(ref, SegmentRef):
+            return [ref.path, ref.offset, ref.length]
+        st = os.stat(ref)
+        return [st.st_mtime_ns, st.st_size]
+
+    @staticmethod
+    def _manifest_path(output_path):
+        p = Path(output_path)
+        return p.with_name(f"{p.name}.manifest.json")
+
+    def _load_manifest(self, output_path):
+        """{id: version} des annonces déjà présentes dans le CSV, ou None."""
+        path = self._manifest_path(output_path)
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))["entries"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_manifest(self, output_path, entries):
+        atomic_write_text(
+            self._manifest_path(output_path),
+            json.dumps({"output": str(output_path), "entries": entries}),
+        )
 
     # ------------------------------------------------------------------
     # FUSION DES JSON
     # ------------------------------------------------------------------
-    def _merge_jsons(self, json_list):
-        dfs = []
+    def _extract_columns(self, json_list):
+        """
+        Extrait une liste d'annonces en colonnes {colonne: valeurs}.
+        Les colonnes absentes d'une annonce sont complétées par NaN.
+        Retourne (colonnes, nb_lignes, erreurs, durées) avec
+        erreurs = [(source, étape, type, message)] et
+        durées = {"read": s, "extract": s} cumulées sur les annonces.
+        """
+        columns = {}
+        errors = []
+        timings = {"read": 0.0, "extract": 0.0}
+        n = 0
+        clock = time.perf_counter
         for p in json_list:
+            t0 = clock()
+            try:
+                data = self._read_json(p)
+            except Exception as e:
+                errors.append((str(p), "read", type(e).__name__, str(e)))
+                continue
+            t1 = clock()
             try:
-                dfs.append(self._json_to_df(p))
+                record = self._record_from_data(data)
             except Exception as e:
-                print(f"❌ Erreur JSON {p}: {e}")
-        if not dfs:
+                errors.append((str(p), "extract", type(e).__name__, str(e)))
+                continue
+            for key, value in record.items():
+                col = columns.get(key)
+                if col is None:
+                    col = columns[key] = [np.nan] * n
+                col.append(value)
+            n += 1
+            for col in columns.values():
+                if len(col) < n:
+                    col.append(np.nan)
+            timings["read"] += t1 - t0
+            timings["extract"] += clock() - t1
+        return columns, n, errors, timings
+
+    def _n_workers(self, n_files):
+        if n_files < self.parallel_threshold:
+            return 1
+        return self.workers or os.cpu_count() or 1
+
+    def _merge_jsons(self, json_list, pool=None):
+        """
+        Extraction en colonnes puis une seule construction du DataFrame.
+        Au-delà de `parallel_threshold` annonces, la liste est découpée en
+        paquets traités par un ProcessPoolExecutor (`pool` s'il est fourni,
+        sinon un pool créé pour l'appel) ; les résultats partiels
+        (colonnes) sont concaténés une seule fois.
+        """
+        json_list = list(json_list)
+        workers = self._n_workers(len(json_list))
+        start = time.perf_counter()
+
+        if workers > 1:
+            n_chunks = workers * 4
+            size = -(-len(json_list) // n_chunks)
+            chunks = [json_list[i:i + size] for i in range(0, len(json_list), size)]
+            with nullcontext(pool) if pool else ProcessPoolExecutor(max_workers=workers) as executor:
+                partials = list(executor.map(_extract_chunk, [self] * len(chunks), chunks))
+        else:
+            partials = [self._extract_columns(json_list)]
+
+        # Lecture / extraction : temps cumulés sur les annonces (CPU des
+        # workers en mode parallèle, d'où wall_seconds à part)
+        report = self.report
+        read_s = sum(t["read"] for *_, t in partials)
+        extract_s = sum(t["extract"] for *_, t in partials)
+        n_ok = sum(n for _, n, _, _ in partials)
+        wall = time.perf_counter() - start
+        for stage, seconds in (("read", read_s), ("extract", extract_s)):
+            report.add_stage(stage, seconds, rows_in=len(json_list), rows_out=n_ok,
+                             workers=workers, wall_seconds=round(wall, 4))
+        for _, _, errors, _ in partials:
+            for source, stage, error_type, message in errors:
+                report.error(stage, error_type, message, source)
+        n_errors = sum(len(e) for _, _, e, _ in partials)
+        if n_errors:
+            print(f"❌ {n_errors} annonce(s) illisible(s) — détail dans le rapport")
+
+        with report.stage("concat", rows_in=n_ok) as stage:
+            df = self._concat_partials(partials)
+            stage["columns"] = df.shape[1]
+        return df
+
+    @staticmethod
+    def _concat_partials(partials):
+        columns = {}
+        total = 0
+        for cols, n, _, _ in partials:
+            for key, values in cols.items():
+                if key not in columns:
+                    columns[key] = [np.nan] * total
+                columns[key].extend(values)
+            total += n
+            for values in columns.values():
+                if len(values) < total:
+                    values.extend([np.nan] * (total - len(values)))
+
+        if not total:
             return pd.DataFrame()
-        return pd.concat(dfs, ignore_index=True)
+        return pd.DataFrame(columns)
 
     # ------------------------------------------------------------------
     # NETTOYAGE
     # ------------------------------------------------------------------
     @staticmethod
     def _clean_numeric(series):
-        return (
-            series.astype(str)
-            .str.replace(r"[^\d,\.]", "", regex=True)
-            .str.replace(",", ".", regex=False)
-            .replace({"": np.nan, ".": np.nan})
-            .astype(float)
+        """
+        Valeurs déjà numériques dans le JSON (int/float) → float directement ;
+        seules les autres valeurs (texte "41,8 m²", "1 200 €"...) passent par
+        les regex.
+        """
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            return series.astype(float)
+
+        values = series.to_numpy(dtype=object)
+        is_num = np.fromiter(
+            (isinstance(v, (int, float)) and not isinstance(v, bool) for v in values),
+            dtype=bool,
+            count=len(values),
         )
+        out = np.full(len(values), np.nan)
+        out[is_num] = values[is_num].astype(float)
+
+        if not is_num.all():
+            text = pd.Series(values[~is_num], dtype=object)
+            out[~is_num] = (
+                text.astype(str)
+                .str.replace(r"[^\d,\.]", "", regex=True)
+                .str.replace(",", ".", regex=False)
+                .replace({"": np.nan, ".": np.nan})
+                .astype(float)
+                .to_numpy()
+            )
+        return pd.Series(out, index=series.index, name=series.name)
 
     @staticmethod
-    def _centroid(row):
-        coords = row["geometry_coords"]
-        if isinstance(coords, str):
-            try:
-                coords = ast.literal_eval(coords)
-            except Exception:
-                return pd.Series([np.nan, np.nan])
-        geom = {"type": row["geometry_type"], "coordinates": coords}
+    def _literal(text):
+        """Coordonnées sérialisées en texte (anciens CSV) → listes Python."""
         try:
-            c = shape(geom).centroid
-            return pd.Series([c.x, c.y])
+            return ast.literal_eval(text)
         except Exception:
-            return pd.Series([np.nan, np.nan])
+            return None
+
+    @staticmethod
+    def _centroids(types, coords):
+        """
+        Centroïdes (lon, lat) vectorisés :
+        - Point : coordonnées lues directement dans des tableaux numpy
+        - autres géométries : parsing GeoJSON + centroïdes en bloc (shapely 2)
+        Type insensible à la casse (comme shapely.geometry.shape).
+        Géométrie absente, invalide ou vide → NaN.
+        """
+        types = [_GEOJSON_TYPES.get(t.lower(), t) if isinstance(t, str) else t for t in types]
+        coords = [SeLogerDataProcessor._literal(c) if isinstance(c, str) else c for c in coords]
+        lon = np.full(len(types), np.nan)
+        lat = np.full(len(types), np.nan)
+
+        points, others = [], []
+        for i, (t, c) in enumerate(zip(types, coords)):
+            if not isinstance(c, (list, tuple)) or not isinstance(t, str):
+                continue
+            if t == "Point":
+                if len(c) >= 2 and all(isinstance(v, (int, float)) for v in c[:2]):
+                    points.append(i)
+            else:
+                others.append(i)
+
+        if points:
+            xy = np.array([coords[i][:2] for i in points], dtype=float)
+            lon[points], lat[points] = xy[:, 0], xy[:, 1]
+
+        if others:
+            geojson = np.array([
+                json.dumps({"type": types[i], "coordinates": coords[i]}) for i in others
+            ], dtype=object)
+            centers = shapely.centroid(shapely.from_geojson(geojson, on_invalid="ignore"))
+            # coordonnées [] → centroïde vide : get_x lèverait GEOSException
+            ok = ~(shapely.is_missing(centers) | shapely.is_empty(centers))
+            rows = np.asarray(others)[ok]
+            lon[rows], lat[rows] = shapely.get_x(centers[ok]), shapely.get_y(centers[ok])
+
+        return lon, lat
 
     @staticmethod
     def _infer_city(zip_code):
         return None 
 
-    def _clean_dataframe(self, df, output_path):
-        df = df.rename(columns=self.rename)
-        df.drop_duplicates(subset=["id"], inplace=True)
-        df.dropna(subset=["livingSpace"], inplace=True)
+    def _clean(self, df, near_dedup=None):
+        stage = self.report.stage
+
+        with stage("rename_dedup", rows_in=len(df)) as st:
+            df = df.rename(columns=self.rename)
+            df.drop_duplicates(subset=["id"], inplace=True)
+            if "livingSpace" not in df.columns:
+                df["livingSpace"] = np.nan  # lot d'annonces sans surface
+            df.dropna(subset=["livingSpace"], inplace=True)
+            st["rows_out"] = len(df)
 
         # Dates
-        df["creation_date"] = pd.to_datetime(df["creation_date"], errors="coerce")
-        df["update_date"] = pd.to_datetime(df["update_date"], errors="coerce")
+        with stage("dates", rows_in=len(df)) as st:
+            df["creation_date"] = pd.to_datetime(df["creation_date"], format="ISO8601", errors="coerce")
+            df["update_date"] = pd.to_datetime(df["update_date"], format="ISO8601", errors="coerce")
+            st["invalid"] = int(df["update_date"].isna().sum())
 
         # Géométrie
-        df[["lon", "lat"]] = df.apply(self._centroid, axis=1)
+        with stage("centroid", rows_in=len(df)) as st:
+            df["lon"], df["lat"] = self._centroids(df["geometry_type"], df["geometry_coords"])
+            st["missing"] = int(df["lon"].isna().sum())
 
-        # Catégories
-        for c in self.cat_cols:
-            if c in df.columns:
-                df[c] = df[c].astype("category")
+        # Catégories + numériques
+        with stage("numeric", rows_in=len(df)) as st:
+            for c in self.cat_cols:
+                if c in df.columns:
+                    df[c] = df[c].astype("category")
 
-        # Numériques
-        for c in self.num_cols:
-            if c in df.columns:
-                df[c] = self._clean_numeric(df[c])
+            for c in self.num_cols:
+                if c in df.columns:
+                    df[c] = self._clean_numeric(df[c])
+
+            # Prix au m²
+            df["price_m2"] = (df["price_value"] / df["livingSpace"]).round(0)
 
-        # Prix au m²
-        df["price_m2"] = (df["price_value"] / df["livingSpace"]).round(0)
+            df = df[df["city"].notna()]
+            st["rows_out"] = len(df)
 
-        df = df[df["city"].notna()]
+        # Quasi-doublons (même bien, autre agence ou nouvel id)
+        if self.near_dedup if near_dedup is None else near_dedup:
+            with stage("near_dedup", rows_in=len(df)) as st:
+                df = df.assign(dup_cluster=assign_clusters(df))
+                st["clusters"] = int(df["dup_cluster"].nunique())
 
-        # Export
+        return df
+
+    # ------------------------------------------------------------------
+    # SORTIE : Parquet typé (défaut) ou CSV
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _is_csv(output_path):
+        return Path(output_path).suffix.lower() == ".csv"
+
+    def _to_table(self, df):
+        """DataFrame nettoyé → table Arrow au schéma fixe."""
+        df = df.copy()
+        for c in ("creation_date", "update_date"):
+            if c not in df.columns:
+                continue
+            if not pd.api.types.is_datetime64_any_dtype(df[c]):
+                df[c] = pd.to_datetime(df[c], format="ISO8601", errors="coerce", utc=True)
+            elif df[c].dt.tz is None:
+                df[c] = df[c].dt.tz_localize("UTC")
+        if "geometry_coords" in df.columns:
+            df["geometry_coords"] = [
+                json.dumps(c) if isinstance(c, (list, tuple)) else None
+                for c in df["geometry_coords"]
+            ]
+        if "keyfacts" in df.columns:
+            df["keyfacts"] = [
+                [str(v) for v in k] if isinstance(k, (list, tuple)) else None
+                for k in df["keyfacts"]
+            ]
+
+        fields = [f for f in self.schema if f.name in df.columns]
+        known = {f.name for f in fields}
+        for c in df.columns:
+            if c not in known:
+                df[c] = [None if pd.isna(v) else str(v) for v in df[c]]
+                fields.append(pa.field(c, pa.string()))
+        return pa.Table.from_pandas(
+            df[[f.name for f in fields]], schema=pa.schema(fields), preserve_index=False
+        )
+
+    def _save(self, df, output_path):
+        with self.report.stage("export", rows_in=len(df)) as st:
+            self._write(df, output_path)
+            st["bytes"] = Path(output_path).stat().st_size
+
+    def _write(self, df, output_path):
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        # Forcer geometry_coords en string pour éviter PyArrow
+
+        if self._is_csv(output_path):
+            # Forcer geometry_coords en string pour éviter PyArrow
+            if "geometry_coords" in df.columns:
+                df["geometry_coords"] = df["geometry_coords"].astype(str)
+            df.to_csv(output_path, index=False)
+            return
+
+        # Écriture atomique : la page Visualisation peut lire en parallèle
+        tmp = Path(output_path).with_name(f".{Path(output_path).name}.tmp")
+        pq.write_table(self._to_table(df), tmp)
+        os.replace(tmp, output_path)
+
+    def load(self, output_path, columns=None):
+        """
+        Relit une sortie nettoyée. En Parquet, seules les colonnes demandées
+        sont lues et les types (catégories, dates, coordonnées) sont conservés.
+        """
+        if self._is_csv(output_path):
+            if columns is not None:
+                header = pd.read_csv(output_path, nrows=0).columns
+                columns = [c for c in columns if c in header]
+            return pd.read_csv(output_path, usecols=columns)
+
+        path = Path(output_path)
+        if columns is not None:
+            available = pq.read_schema(path).names
+            columns = [c for c in columns if c in available]
+        df = pq.read_table(path, columns=columns).to_pandas()
         if "geometry_coords" in df.columns:
-            df["geometry_coords"] = df["geometry_coords"].astype(str)
+            df["geometry_coords"] = [
+                json.loads(c) if c is not None else None for c in df["geometry_coords"]
+            ]
+        if "keyfacts" in df.columns:
+            df["keyfacts"] = [list(k) if k is not None else None for k in df["keyfacts"]]
+        return df
 
-        df.to_csv(output_path, index=False)
+    def _clean_dataframe(self, df, output_path):
+        df = self._clean(df)
+        self._save(df, output_path)
+        return df
 
+    def _read_clean_csv(self, output_path):
+        """
+        Relit un CSV nettoyé en conservant le texte des colonnes non
+        numériques (codes postaux, facts bruts) pour le réécrire à l'identique.
+        """
+        header = pd.read_csv(output_path, nrows=0).columns
+        numeric = set(self.num_cols) | {"price_m2", "lon", "lat"}
+        df = pd.read_csv(output_path, dtype={c: str for c in header if c not in numeric})
+        for c in ("creation_date", "update_date"):
+            if c in df.columns:
+                df[c] = pd.to_datetime(df[c], format="ISO8601", errors="coerce")
         return df
+
+    def _update_incremental(self, changed, removed, output_path):
+        """
+        Fusionne dans la sortie existante les annonces nouvelles/modifiées et
+        retire les annonces supprimées (déduplication sur id).
+        """
+        if self._is_csv(output_path):
+            existing = self._read_clean_csv(output_path)
+        else:
+            existing = self.load(output_path)
+        stale = set(removed) | {self._ref_id(r) for r in changed}
+        parts = [existing[~existing["id"].isin(stale)]]
+
+        df_raw = self._merge_jsons(changed)
+        print(f"🔢 DataFrame brut (delta) : {df_raw.shape}")
+        if not df_raw.empty:
+            df_new = self._clean(df_raw, near_dedup=False)
+            if not df_new.empty:
+                df_new["id"] = df_new["id"].astype(str)
+                parts.append(df_new)
+
+        df = pd.concat(parts, ignore_index=True)
+        df.drop_duplicates(subset=["id"], keep="last", inplace=True)
+        if self.near_dedup:
+            # les clusters dépendent de toutes les annonces : recalculés
+            with self.report.stage("near_dedup", rows_in=len(df)):
+                df["dup_cluster"] = assign_clusters(df)
+        for c in self.cat_cols:
+            if c in df.columns:
+                df[c] = df[c].astype("category")
+
+        self._save(df, output_path)
+        print(f"✨ DataFrame nettoyé : {df.shape}")
+        print(f"💾 Sauvegardé -> {output_path}")
+        return df
+
     def _process_and_save(self, json_files, output_path):
         df_raw = self._merge_jsons(json_files)
         print(f"🔢 DataFrame brut : {df_raw.shape}")
@@ -218,51 +635,262 @@ class SeLogerDataProcessor:
 
         return df_clean
 
+    @staticmethod
+    def _project(df, columns):
+        if columns is None:
+            return df
+        return df[[c for c in columns if c in df.columns]]
+
     # ------------------------------------------------------------------
     # PIPELINE FINAL
     # ------------------------------------------------------------------
-    def run(self, city_name=None, output_path="data/cleaned.csv"):
+    def run(self, city_name=None, output_path="data/cleaned.parquet", columns=None):
         """
-        Ne nettoie que si nécessaire :
-        - CSV non existant
-        - un JSON plus récent que le CSV
-        Sinon, charge directement le CSV.
+        Nettoyage incrémental piloté par un manifeste ({id: version}) stocké
+        à côté de la sortie (<sortie>.manifest.json) :
+        - sortie ou manifeste absent → nettoyage complet
+        - annonces nouvelles/modifiées → seules celles-ci sont nettoyées
+          puis fusionnées à la sortie existante
+        - annonces disparues → retirées de la sortie
+        Sinon, charge directement la sortie.
+
+        Format selon l'extension : Parquet typé (défaut) ou .csv.
+        `columns` limite les colonnes retournées (projection en Parquet).
+
+        Durée, mémoire et lignes par étape + erreurs par type : self.report,
+        écrit dans <sortie>.report.json.
         """
+        self.report = PipelineReport(f"{city_name or 'toutes les villes'} → {output_path}")
+        df, mode = self._run(city_name, output_path, columns)
+
+        self.report.info.update(city=city_name, output=str(output_path), mode=mode, rows=len(df))
+        if Path(output_path).parent.exists():
+            self.report.save(self._report_path(output_path))
+        print(self.report.summary())
+        return df
+
+    @staticmethod
+    def _report_path(output_path):
+        p = Path(output_path)
+        return p.with_name(f"{p.name}.report.json")
 
+    def _run(self, city_name, output_path, columns):
         print(f"📂 Vérification de : {city_name}")
 
-        json_files = self._list_jsons(city_name)
+        with self.report.stage("list") as st:
+            json_files = list(self._list_jsons(city_name))
+            entries = {self._ref_id(r): self._signature(r) for r in json_files}
+            st["rows_out"] = len(json_files)
+
         if not json_files:
             print("⚠️ Aucun fichier JSON trouvé.")
-            return pd.DataFrame()
-
-        json_files = list(json_files)
-        last_json_time = max(f.stat().st_mtime for f in json_files)
+            return pd.DataFrame(), "empty"
 
-        csv_path = Path(output_path)
+        previous = self._load_manifest(output_path) if Path(output_path).exists() else None
 
         # ------------------------------
-        # 1. CSV inexistant → nettoyer
+        # 1. Sortie ou manifeste inexistant → nettoyage complet
         # ------------------------------
-        if not csv_path.exists():
-            print("📄 Aucun CSV existant → nettoyage obligatoire.")
-            return self._process_and_save(json_files, output_path)
+        if previous is None:
+            print("📄 Aucune sortie (ou manifeste) existante → nettoyage complet.")
+            df = self._process_and_save(json_files, output_path)
+            self._save_manifest(output_path, entries)
+            self._write_aggregates(df, output_path, city_name)
+            return self._project(df, columns), "full"
 
         # ------------------------------
-        # 2. Vérifier si un JSON est plus récent que le CSV
+        # 2. Annonces nouvelles, modifiées ou supprimées → delta
         # ------------------------------
-        csv_time = csv_path.stat().st_mtime
+        changed = [r for r in json_files if previous.get(self._ref_id(r)) != entries[self._ref_id(r)]]
+        removed = previous.keys() - entries.keys()
 
-        if last_json_time > csv_time:
-            print("🔄 JSON plus récents détectés → re-clean nécessaire.")
-            return self._process_and_save(json_files, output_path)
+        if changed or removed:
+            print(f"🔄 {len(changed)} annonce(s) nouvelle(s)/modifiée(s), "
+                  f"{len(removed)} supprimée(s) → mise à jour incrémentale.")
+            df = self._update_incremental(changed, removed, output_path)
+            self._save_manifest(output_path, entries)
+            self._write_aggregates(df, output_path, city_name)
+            return self._project(df, columns), "incremental"
 
         # ------------------------------
-        # 3. Sinon, on charge le CSV directement
+        # 3. Sinon, on charge la sortie directement
         # ------------------------------
-        print("✅ CSV déjà propre et à jour → chargement direct.")
-        return pd.read_csv(output_path)
+        print("✅ Sortie déjà propre et à jour → chargement direct.")
+        with self.report.stage("load") as st:
+            df = self.load(output_path, columns)
+            st["rows_out"] = len(df)
+        if load_summary(self._summary_path(output_path)) is None or not self._grid_path(output_path).exists():
+            self._write_aggregates(self.load(output_path, SUMMARY_COLUMNS), output_path, city_name)
+        return df, "cached"
+
+    @staticmethod
+    def _summary_path(output_path):
+        p = Path(output_path)
+        return p.with_name(f"{p.name}.summary.json")
+
+    @staticmethod
+    def _grid_path(output_path):
+        p = Path(output_path)
+        return p.with_name(f"{p.name}.grid.parquet")
+
+    def _write_aggregates(self, df, output_path, city_name):
+        """Résumé (summary.py) et grille spatiale (spatial_grid.py) lus par la page Visualisation."""
+        with self.report.stage("summary", rows_in=len(df)):
+            save_summary(summarize(df, city_name), self._summary_path(output_path))
+        with self.report.stage("grid", rows_in=len(df)) as st:
+            grid = build_grid(df)
+            save_grid(grid, self._grid_path(output_path))
+            st["rows_out"] = len(grid)
+
+
+    # ------------------------------------------------------------------
+    # MODE STREAMING (toutes les villes, mémoire bornée)
+    # ------------------------------------------------------------------
+    PARTITION_KEY = "search_city"
+
+    def _stream_refs(self, stores, seen, chunk_size):
+        """Références par paquets de `chunk_size`, doublons inter-villes exclus."""
+        for store in stores:
+            chunk = []
+            for ref in store.refs():
+                ad_id = self._ref_id(ref)
+                if ad_id in seen:
+                    continue
+                seen.add(ad_id)
+                chunk.append(ref)
+                if len(chunk) >= chunk_size:
+                    yield store.base.name, chunk
+                    chunk = []
+            if chunk:
+                yield store.base.name, chunk
+
+    def _stream_extract(self, chunks, pool=None):
+        for city, refs in chunks:
+            yield city, self._merge_jsons(refs, pool)
+
+    def _stream_clean(self, frames, index=None):
+        """
+        Nettoyage (centroïdes compris) paquet par paquet. Les quasi-doublons
+        se cherchent entre paquets : chaque paquet alimente `index`
+        (signatures seulement), résolu une fois le flux terminé.
+        """
+        for city, df_raw in frames:
+            if df_raw.empty:
+                continue
+            df = self._clean(df_raw, near_dedup=False)
+            if index is not None:
+                index.add(df)
+            yield city, df
+
+    def _stream_write(self, frames, output_dir, cities=()):
+        """
+        Un fichier Parquet par paquet dans <sortie>/search_city=<ville>/.
+        Chaque partition est écrite dans un dossier temporaire puis
+        remplace l'ancienne une fois la ville terminée. L'ancienne partition
+        d'une ville de `cities` sans aucune annonce cette fois est supprimée.
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        counts = {}
+
+        def publish(city):
+            final = output_dir / f"{self.PARTITION_KEY}={city}"
+            if final.exists():
+                shutil.rmtree(final)
+            (output_dir / f".{self.PARTITION_KEY}={city}.tmp").rename(final)
+
+        current = None
+        for city, df in frames:
+            if city != current:
+                if current is not None:
+                    publish(current)
+                current = city
+                tmp = output_dir / f".{self.PARTITION_KEY}={city}.tmp"
+                shutil.rmtree(tmp, ignore_errors=True)
+                tmp.mkdir()
+            part = counts.get(city, 0)
+            with self.report.stage("export", rows_in=len(df)):
+                pq.write_table(self._to_table(df), tmp / f"part-{part:05d}.parquet")
+            counts[city] = part + 1
+            print(f"💾 {city} : paquet {part} ({len(df)} annonces)")
+        if current is not None:
+            publish(current)
+        for city in cities:
+            if city not in counts:
+                shutil.rmtree(output_dir / f"{self.PARTITION_KEY}={city}", ignore_errors=True)
+        return counts
+
+    def run_streaming(self, output_dir="data/clean_all", chunk_size=20000, city_name=None):
+        """
+        Nettoyage de toutes les villes (ou d'une seule) en flux :
+        extraction → nettoyage → centroïdes → écriture, par paquets de
+        `chunk_size` annonces. La mémoire est bornée par la taille d'un
+        paquet (plus l'ensemble des id déjà vus, pour dédupliquer entre
+        paquets et entre villes : la première occurrence est gardée).
+        Sortie partitionnée par ville : <output_dir>/search_city=<ville>/,
+        clusters de quasi-doublons dans <output_dir>/dup_clusters.parquet.
+        """
+        self.report = PipelineReport(f"streaming {city_name or 'toutes les villes'} → {output_dir}")
+        stores = open_city_stores(city_name)
+        seen = set()
+        index = NearDuplicateIndex() if self.near_dedup else None
+        chunks = self._stream_refs(stores, seen, chunk_size)
+        # un seul pool pour tout le flux (pas un démarrage de process par paquet)
+        workers = self._n_workers(chunk_size)
+        with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as pool:
+            frames = self._stream_clean(self._stream_extract(chunks, pool), index)
+            counts = self._stream_write(frames, output_dir, [s.base.name for s in stores])
+        if index is not None:
+            with self.report.stage("near_dedup", rows_in=len(index)):
+                clusters = index.clusters().reset_index()
+                self._save_clusters(clusters, Path(output_dir) / "dup_clusters.parquet")
+
+        self.report.info.update(city=city_name, output=str(output_dir), mode="streaming",
+                                rows=len(seen), partitions=counts)
+        self.report.save(Path(output_dir) / "report.json")
+        print(f"✨ {len(seen)} annonces traitées → {output_dir} ({len(counts)} villes)")
+        return counts
+
+    @staticmethod
+    def _save_clusters(clusters, path):
+        tmp = path.with_name(f".{path.name}.tmp")
+        pq.write_table(pa.Table.from_pandas(clusters, preserve_index=False), tmp)
+        os.replace(tmp, path)
+
+    def load_partitioned(self, output_dir="data/clean_all", cities=None, columns=None):
+        """Relit la sortie streaming (villes et colonnes au choix)."""
+        output_dir = Path(output_dir)
+        clusters_path = output_dir / "dup_clusters.parquet"
+        with_clusters = clusters_path.exists() and (columns is None or "dup_cluster" in columns)
+        extra_id = with_clusters and columns is not None and "id" not in columns
+        if extra_id:
+            columns = list(columns) + ["id"]
+        frames = []
+        for part_dir in sorted(output_dir.glob(f"{self.PARTITION_KEY}=*")):
+            city = part_dir.name.split("=", 1)[1]
+            if cities is not None and city not in cities:
+                continue
+            for f in sorted(part_dir.glob("*.parquet")):
+                df = self.load(f, columns)
+                df[self.PARTITION_KEY] = city
+                frames.append(df)
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        for c in self.cat_cols:
+            if c in df.columns:
+                df[c] = df[c].astype("category")
+        if with_clusters:
+            clusters = pq.read_table(clusters_path).to_pandas()
+            df = df.drop(columns=["dup_cluster"], errors="ignore").merge(clusters, on="id", how="left")
+            if extra_id:
+                df = df.drop(columns=["id"])
+        return df
+
 
+def _extract_chunk(processor, json_list):
+    """Point d'entrée des workers (fonction de module pour être picklable)."""
+    return processor._extract_columns(json_list)
 
 
 # ----------------------------------------------------------------------
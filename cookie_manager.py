@@ -0,0 +1,105 @@
+import json
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+import requests
+from filelock import FileLock
+
+from storage import atomic_write_text
+
+
+class CookieManager:
+    """
+    Cookies SeLoger partagés par tous les clients HTTP.
+
+    Un refresh lance Chrome (get_cookie.py) : il ne doit y en avoir qu'un
+    à la fois, même avec plusieurs scrapers ou plusieurs process Streamlit.
+    - verrou thread + verrou fichier (<cookies>.lock) autour du refresh
+    - compteur de génération (<cookies>.gen) incrémenté à chaque refresh
+    Un appelant passe la génération avec laquelle sa requête a échoué :
+    si elle a déjà changé, un autre worker a rafraîchi pendant qu'il
+    attendait le verrou, il recharge simplement le nouveau cookie.
+    """
+
+    def __init__(self, cookie_path: Path, refresh_cmd: List[str] | None = None) -> None:
+        self.cookie_path = Path(cookie_path)
+        # commande de refresh remplaçable (ex. benchmarks sans navigateur)
+        self.refresh_cmd = refresh_cmd or ["python3", "get_cookie.py"]
+        self.gen_path = self.cookie_path.with_suffix(".gen")
+        self.lock_path = self.cookie_path.with_suffix(".lock")
+
+        self._lock = threading.Lock()
+        self._cookies: List[Dict[str, Any]] | None = None
+        self.generation = -1  # génération des cookies en mémoire
+
+    # ---- génération ----
+    def _read_generation(self) -> int:
+        try:
+            return int(self.gen_path.read_text().strip())
+        except (OSError, ValueError):
+            return 0
+
+    # ---- chargement ----
+    def _reload(self) -> None:
+        if not self.cookie_path.exists():
+            raise FileNotFoundError(f"Échec création cookies: {self.cookie_path}")
+        with self.cookie_path.open(encoding="utf-8") as f:
+            self._cookies = json.load(f)
+        self.generation = self._read_generation()
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Cookies courants (lance get_cookie.py une seule fois si absents)."""
+        with self._lock:
+            if self._cookies is not None:
+                return self._cookies
+        if not self.cookie_path.exists():
+            print("⚠️ Cookies introuvables, lancement de get_cookie.py...")
+            self.refresh(self._read_generation())
+        with self._lock:
+            if self._cookies is None:
+                self._reload()
+            return self._cookies
+
+    def refresh(self, seen_generation: int) -> int:
+        """
+        Rafraîchit les cookies si personne ne l'a fait depuis
+        `seen_generation`, puis retourne la génération courante.
+        """
+        with self._lock, FileLock(str(self.lock_path)):
+            current = self._read_generation()
+            if current > seen_generation and self.cookie_path.exists():
+                print("🔑 Cookie déjà rafraîchi par un autre worker, réutilisation.")
+            else:
+                print("🔑 Refresh cookie via get_cookie.py...")
+                subprocess.run(self.refresh_cmd, check=True)
+                current += 1
+                atomic_write_text(self.gen_path, str(current))
+            self._reload()
+            return self.generation
+
+    def apply(self, session: requests.Session) -> int:
+        """Place les cookies dans le cookie jar de la session."""
+        cookies = self.load()
+        session.cookies.clear()
+        for c in cookies:
+            session.cookies.set(c["name"], c["value"])
+        return self.generation
+
+
+# -------------------------------------------------------------------------
+# INSTANCES PARTAGÉES PAR FICHIER DE COOKIES
+# -------------------------------------------------------------------------
+
+_managers: Dict[Path, CookieManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_cookie_manager(cookie_path: str | Path) -> CookieManager:
+    """Un seul CookieManager par fichier de cookies dans le process."""
+    path = Path(cookie_path).resolve()
+    with _managers_lock:
+        if path not in _managers:
+            _managers[path] = CookieManager(path)
+        return _managers[path]
@@ -0,0 +1,312 @@
+"""
+Détection des quasi-doublons d'annonces (même bien publié par plusieurs
+agences, ou republié sous un nouvel id).
+
+- MinHash sur les 3-grammes de mots de la description, bandes LSH :
+  seules les annonces qui partagent au moins une bande sont comparées
+  (coût ~linéaire, pas de comparaison de toutes les paires)
+- vérification des candidats : similarité estimée, surface, prix, distance
+- annonces sans description : blocage sur (lat/lon arrondis, surface, prix)
+- union-find → un identifiant de cluster par annonce
+
+    python dedup.py data/lyon_clean.parquet
+"""
+
+import re
+from functools import lru_cache
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_RE = re.compile(r"\w+")
+
+
+# -------------------------------------------------------------------------
+# SHINGLES + MINHASH
+# -------------------------------------------------------------------------
+
+class MinHasher:
+    """
+    Signatures MinHash vectorisées (numpy) sur des 3-grammes de mots.
+    Tout un paquet de textes est découpé en une fois : mots → hash stable
+    (pd.util.hash_array), n-grammes combinés par décalage des tableaux, min par annonce via np.minimum.reduceat.
+    Hachage par permutation : multiply-shift 64 bits (pas de modulo).
+    """
+
+    def __init__(self, num_perm: int = 64, ngram: int = 3, seed: int = 1) -> None:
+        self.num_perm = num_perm
+        self.ngram = ngram
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, np.iinfo(np.int64).max, num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, np.iinfo(np.int64).max, num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def _word_hashes(words: list[str]) -> np.ndarray:
+        """Hash 64 bits stable (clé fixe) de chaque mot, vectorisé par pandas."""
+        return pd.util.hash_array(np.asarray(words, dtype=object)) & _MAX_HASH
+
+    def shingles(self, texts) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Hashs des n-grammes de mots de tous les textes, concaténés, et
+        nombre de n-grammes par texte (0 si texte absent ou trop court).
+        """
+        texts = pd.Series(list(texts), dtype=object)
+        texts = texts.where(texts.map(lambda t: isinstance(t, str)), "")
+        tokens = texts.str.lower().str.findall(_WORD_RE)
+        n_words = tokens.str.len().to_numpy(dtype=np.int64)
+        counts = np.maximum(n_words - self.ngram + 1, 0)
+        if not counts.sum():
+            return np.empty(0, dtype=np.uint64), counts
+
+        w = self._word_hashes(list(chain.from_iterable(tokens)))
+        n = len(w) - self.ngram + 1
+        h = np.zeros(n, dtype=np.uint64)
+        for k in range(self.ngram):
+            h = (h * np.uint64(1000003) + w[k:k + n]) & _MAX_HASH
+
+        # on ne garde que les n-grammes qui ne chevauchent pas deux textes
+        starts = np.concatenate(([0], np.cumsum(n_words)[:-1]))
+        doc = np.repeat(np.arange(len(n_words)), n_words)[:n]
+        keep = np.arange(n) - starts[doc] < counts[doc]
+        return h[keep], counts
+
+    def signatures(self, texts, block: int = 100_000) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Signatures (n, num_perm) en uint32 + masque des textes exploitables.
+        Les n-grammes sont hachés par blocs d'environ `block` (alignés sur
+        les annonces) pour borner la mémoire de la matrice num_perm × block.
+        """
+        x, counts = self.shingles(texts)
+        valid = counts > 0
+        sig = np.full((len(counts), self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+
+        rows = np.flatnonzero(valid)
+        ends = np.cumsum(counts[rows])
+        starts = ends - counts[rows]
+        # coupures aux frontières d'annonces tous les ~`block` n-grammes
+        cuts = np.unique(np.searchsorted(ends, np.arange(block, ends[-1] if len(ends) else 0, block)))
+        for lo, hi in zip(np.r_[0, cuts + 1], np.r_[cuts + 1, len(rows)]):
+            if lo >= hi:
+                continue
+            x_block = x[starts[lo]:ends[hi - 1]]
+            hashed = (self.a[:, None] * x_block[None, :] + self.b[:, None]) >> np.uint64(32)
+            sig[rows[lo:hi]] = np.minimum.reduceat(hashed, starts[lo:hi] - starts[lo], axis=1).T
+
+        return sig, valid
+
+
+# -------------------------------------------------------------------------
+# PAIRES + UNION-FIND
+# -------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def _triu(size: int) -> tuple[np.ndarray, np.ndarray]:
+    """Toutes les paires (i < j) d'un bucket de taille `size`."""
+    return np.triu_indices(size, k=1)
+
+
+def _clusters_from_pairs(n: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Composantes connexes → id de cluster contigu, dans l'ordre d'apparition."""
+    parent = np.arange(n)
+
+    def find(i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    for i, j in zip(left.tolist(), right.tolist()):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    roots = np.fromiter((find(i) for i in range(n)), dtype=np.int64, count=n)
+    _, labels = np.unique(roots, return_inverse=True)
+    return labels.astype(np.int64)
+
+
+# -------------------------------------------------------------------------
+# INDEX DE QUASI-DOUBLONS
+# -------------------------------------------------------------------------
+
+class NearDuplicateIndex:
+    """
+    Index LSH alimentable par paquets (add) puis résolu en clusters.
+    Seules les signatures et 4 colonnes numériques sont gardées en mémoire
+    (~300 octets par annonce), pas les descriptions.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        threshold: float = 0.5,      # similarité de Jaccard estimée minimale
+        surface_tol: float = 0.02,   # écart relatif de surface toléré
+        price_tol: float = 0.10,     # écart relatif de prix toléré
+        max_km: float = 1.5,         # distance max entre centroïdes
+        max_bucket: int = 10,        # au-delà : ancre + voisins, pas toutes les paires
+        seed: int = 1,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.hasher = MinHasher(num_perm=num_perm, seed=seed)
+        self.bands = bands
+        self.threshold = threshold
+        self.surface_tol = surface_tol
+        self.price_tol = price_tol
+        self.max_km = max_km
+        self.max_bucket = max_bucket
+
+        self._ids: list[np.ndarray] = []
+        self._sigs: list[np.ndarray] = []
+        self._valid: list[np.ndarray] = []
+        self._num: list[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(len(i) for i in self._ids)
+
+    @staticmethod
+    def _column(df: pd.DataFrame, name: str) -> np.ndarray:
+        if name not in df.columns:
+            return np.full(len(df), np.nan)
+        return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float)
+
+    def add(self, df: pd.DataFrame, batch: int = 5000) -> None:
+        """Ajoute un paquet d'annonces nettoyées (id, description, lat, lon, surface, prix)."""
+        if df.empty:
+            return
+        texts = df["description"].tolist() if "description" in df.columns else [None] * len(df)
+        # par lots : les listes de mots d'un lot seulement sont en mémoire
+        parts = [self.hasher.signatures(texts[i:i + batch]) for i in range(0, len(texts), batch)]
+        sig = np.concatenate([p[0] for p in parts])
+        valid = np.concatenate([p[1] for p in parts])
+        self._ids.append(df["id"].astype(str).to_numpy())
+        self._sigs.append(sig)
+        self._valid.append(valid)
+        self._num.append(np.column_stack([
+            self._column(df, "lat"),
+            self._column(df, "lon"),
+            self._column(df, "livingSpace"),
+            self._column(df, "price_value"),
+        ]))
+
+    # ---- candidats ----
+    def _bucket_pairs(self, keys: np.ndarray, members: np.ndarray):
+        """Paires candidates parmi les lignes `members` partageant une même clé."""
+        order = np.argsort(keys, kind="stable")
+        keys, members = keys[order], members[order]
+        bounds = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1], True])
+        starts, sizes = bounds[:-1], np.diff(bounds)
+        shared = sizes >= 2
+        left, right = [], []
+        for s, size in zip(starts[shared].tolist(), sizes[shared].tolist()):
+            group = members[s:s + size]
+            if size <= self.max_bucket:
+                i, j = _triu(size)
+                left.append(group[i])
+                right.append(group[j])
+            else:
+                # gros bucket (texte type d'agence) : ancre + voisins, O(taille)
+                left.append(np.r_[np.repeat(group[0], size - 1), group[1:-1]])
+                right.append(np.r_[group[1:], group[2:]])
+        if not left:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(left), np.concatenate(right)
+
+    def _lsh_candidates(self, sig: np.ndarray, valid: np.ndarray):
+        rows = np.flatnonzero(valid)
+        r = sig.shape[1] // self.bands
+        pairs = np.empty(0, dtype=np.int64)
+        for band in range(self.bands):
+            chunk = np.ascontiguousarray(sig[rows, band * r:(band + 1) * r])
+            keys = chunk.view(np.dtype((np.void, chunk.dtype.itemsize * r))).ravel()
+            _, keys = np.unique(keys, return_inverse=True)
+            left, right = self._bucket_pairs(keys.ravel(), rows)
+            # une même paire sort dans plusieurs bandes : dédupliquée au fil de l'eau
+            pairs = np.union1d(pairs, np.minimum(left, right) * len(sig) + np.maximum(left, right))
+        return pairs // len(sig), pairs % len(sig)
+
+    def _exact_candidates(self, num: np.ndarray, valid: np.ndarray):
+        """Sans description : mêmes lat/lon (~100 m), surface et prix arrondis."""
+        rows = np.flatnonzero(~valid & ~np.isnan(num).any(axis=1))
+        if not len(rows):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        rounded = np.column_stack([
+            np.round(num[rows, 0], 3),
+            np.round(num[rows, 1], 3),
+            np.round(num[rows, 2]),
+            np.round(num[rows, 3], -1),
+        ])
+        _, keys = np.unique(rounded, axis=0, return_inverse=True)
+        return self._bucket_pairs(keys.ravel(), rows)
+
+    # ---- vérification ----
+    @staticmethod
+    def _close(a: np.ndarray, b: np.ndarray, tol: float) -> np.ndarray:
+        """Écart relatif ≤ tol ; valeur inconnue d'un côté → non bloquant."""
+        unknown = np.isnan(a) | np.isnan(b)
+        return unknown | (np.abs(a - b) <= tol * np.fmax(np.abs(a), np.abs(b)))
+
+    def _verify(self, sig, num, left, right) -> np.ndarray:
+        if not len(left):
+            return np.zeros(0, dtype=bool)
+        similarity = (sig[left] == sig[right]).mean(axis=1)
+        ok = similarity >= self.threshold
+        ok &= self._close(num[left, 2], num[right, 2], self.surface_tol)
+        ok &= self._close(num[left, 3], num[right, 3], self.price_tol)
+
+        # distance équirectangulaire (suffisante à l'échelle d'une ville)
+        lat1, lon1, lat2, lon2 = (np.radians(v) for v in (
+            num[left, 0], num[left, 1], num[right, 0], num[right, 1]))
+        x = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
+        km = 6371.0 * np.hypot(x, lat2 - lat1)
+        ok &= np.isnan(km) | (km <= self.max_km)
+        return ok
+
+    def clusters(self) -> pd.Series:
+        """id d'annonce → id de cluster (les annonces uniques ont le leur)."""
+        if not self._ids:
+            return pd.Series(dtype="int64", name="dup_cluster")
+        ids = np.concatenate(self._ids)
+        sig = np.concatenate(self._sigs)
+        valid = np.concatenate(self._valid)
+        num = np.concatenate(self._num)
+
+        left, right = self._lsh_candidates(sig, valid)
+        keep = self._verify(sig, num, left, right)
+        left, right = left[keep], right[keep]
+
+        exact_left, exact_right = self._exact_candidates(num, valid)
+        labels = _clusters_from_pairs(
+            len(ids), np.concatenate([left, exact_left]), np.concatenate([right, exact_right])
+        )
+        return pd.Series(labels, index=pd.Index(ids, name="id"), name="dup_cluster")
+
+
+def assign_clusters(df: pd.DataFrame, **kwargs) -> np.ndarray:
+    """Raccourci : un id de cluster de quasi-doublons par ligne de df."""
+    index = NearDuplicateIndex(**kwargs)
+    index.add(df)
+    return index.clusters().to_numpy()
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from clean_data import SeLogerDataProcessor
+
+    processor = SeLogerDataProcessor()
+    for path in sys.argv[1:]:
+        df = processor.load(path)
+        start = time.perf_counter()
+        df["dup_cluster"] = assign_clusters(df)
+        elapsed = time.perf_counter() - start
+        sizes = df["dup_cluster"].value_counts()
+        print(f"🧬 {path} : {len(df)} annonces → {len(sizes)} biens distincts "
+              f"({int((sizes > 1).sum())} clusters de doublons) en {elapsed:.2f}s")
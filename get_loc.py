@@ -1,30 +1,128 @@
 import requests
 import json
-import subprocess
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+
+from cookie_manager import get_cookie_manager
+
+COOKIE_PATH = Path("cookies/seloger_cookies.json")
+CACHE_PATH = Path("cache/autocomplete.sqlite")
+CACHE_TTL = 30 * 24 * 3600  # un identifiant de ville ne change quasiment jamais
+
+AUTOCOMPLETE_URL = "https://www.seloger.com/search-mfe-bff/autocomplete"
+
+HEADERS = {
+    'sec-ch-ua-full-version-list': '"Chromium";v="142.0.7444.176", "Google Chrome";v="142.0.7444.176", "Not_A Brand";v="99.0.0.0"',
+    'sec-ch-ua-platform': '"Windows"',
+    'Referer': 'https://www.seloger.com/',
+    'sec-ch-ua': '"Chromium";v="142", "Google Chrome";v="142", "Not_A Brand";v="99"',
+    'sec-ch-ua-model': '""',
+    'sec-ch-device-memory': '8',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-arch': '"x86"',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Content-Type': 'application/json',
+}
 
 
 def load_cookie() -> str:
     """Charge le cookie depuis le fichier, ou lance get_cookie.py si absent"""
-    cookie_path = Path("cookies/seloger_cookies.json")
-    
-    if not cookie_path.exists():
-        print("⚠️  Cookies introuvables, lancement de get_cookie.py...")
-        subprocess.run(["python3", "get_cookie.py"], check=True)
-        
-        if not cookie_path.exists():
-            raise FileNotFoundError("Échec de la création du fichier de cookies")
-    
-    with open(cookie_path) as f:
-        cookies = json.load(f)
-    
+    cookies = get_cookie_manager(COOKIE_PATH).load()
     return "; ".join([f"{c['name']}={c['value']}" for c in cookies])
 
 
-def location_autocomplete(text: str) -> dict:
-    """Recherche une location et retourne les suggestions"""
-    url = "https://www.seloger.com/search-mfe-bff/autocomplete"
+# -------------------------------------------------------------------------
+# SESSION HTTP PARTAGÉE (pool de connexions + cookie jar)
+# -------------------------------------------------------------------------
+
+_session: requests.Session | None = None
+_session_gen: int | None = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Session unique du module, cookies rechargés seulement s'ils ont changé."""
+    return _session_with_gen()[0]
+
+
+def _session_with_gen() -> tuple[requests.Session, int | None]:
+    """(session, génération de cookies appliquée), lus sous le même verrou."""
+    global _session, _session_gen
+    manager = get_cookie_manager(COOKIE_PATH)
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+            _session.headers.update(HEADERS)
+        if _session_gen is None or _session_gen != manager.generation:
+            _session_gen = manager.apply(_session)
+        return _session, _session_gen
+
+
+# -------------------------------------------------------------------------
+# CACHE DISQUE (SQLite + TTL) + CACHE MÉMOIRE
+# -------------------------------------------------------------------------
+
+_memory_cache: dict[str, tuple[float, str, str | None]] = {}
+
+
+def normalize_query(text: str) -> str:
+    """Clé de cache : minuscules, espaces normalisés."""
+    return re.sub(r"\s+", " ", text.strip().lower())
+
 
+def _connect() -> sqlite3.Connection:
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=10)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS autocomplete ("
+        " query TEXT PRIMARY KEY,"
+        " location_id TEXT NOT NULL,"
+        " name TEXT,"
+        " fetched_at REAL NOT NULL)"
+    )
+    return conn
+
+
+def _cache_get(key: str, ttl: float):
+    now = time.time()
+    hit = _memory_cache.get(key)
+    if hit is None:
+        with closing(_connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT fetched_at, location_id, name FROM autocomplete WHERE query = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        hit = _memory_cache[key] = tuple(row)
+    fetched_at, location_id, name = hit
+    if now - fetched_at > ttl:
+        return None
+    return location_id, name
+
+
+def _cache_put(key: str, location_id: str, name: str | None) -> None:
+    fetched_at = time.time()
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO autocomplete VALUES (?, ?, ?, ?)",
+            (key, location_id, name, fetched_at),
+        )
+    _memory_cache[key] = (fetched_at, location_id, name)
+
+
+# -------------------------------------------------------------------------
+# AUTOCOMPLETE
+# -------------------------------------------------------------------------
+
+def _fetch_autocomplete(text: str, timeout: float, url: str = AUTOCOMPLETE_URL) -> list:
     payload = json.dumps({
         "text": text,
         "limit": 10,
@@ -32,28 +130,44 @@ def location_autocomplete(text: str) -> dict:
         "parentTypes": ["NBH1", "NBH3", "AD09", "NBH2", "AD08", "AD06", "AD04", "POCO", "AD02"],
         "locale": "fr"
     })
-    
-    headers = {
-        'sec-ch-ua-full-version-list': '"Chromium";v="142.0.7444.176", "Google Chrome";v="142.0.7444.176", "Not_A Brand";v="99.0.0.0"',
-        'sec-ch-ua-platform': '"Windows"',
-        'Referer': 'https://www.seloger.com/',
-        'sec-ch-ua': '"Chromium";v="142", "Google Chrome";v="142", "Not_A Brand";v="99"',
-        'sec-ch-ua-model': '""',
-        'sec-ch-device-memory': '8',
-        'sec-ch-ua-mobile': '?0',
-        'sec-ch-ua-arch': '"x86"',
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36',
-        'Accept': 'application/json, text/plain, */*',
-        'Content-Type': 'application/json',
-        'Cookie': load_cookie()
-    }
-
-    response = requests.post(url, headers=headers, data=payload)
-    data = response.json()
-    
+
+    session, generation = _session_with_gen()
+    response = session.post(url, data=payload, timeout=timeout)
+
+    # Cookie expiré → refresh unique partagé avec les scrapers, puis 1 retry
+    if response.status_code == 403:
+        get_cookie_manager(COOKIE_PATH).refresh(generation)
+        response = get_session().post(url, data=payload, timeout=timeout)
+
+    return response.json()
+
+
+def location_autocomplete(
+    text: str,
+    ttl: float = CACHE_TTL,
+    timeout: float = 15,
+    url: str = AUTOCOMPLETE_URL,
+) -> tuple:
+    """
+    Recherche une location et retourne (location_id, nom).
+    Résultat mis en cache (mémoire + SQLite) pendant `ttl` secondes :
+    les recherches répétées ne font aucun appel réseau.
+    `url` permet de viser un serveur local (benchmarks/fake_seloger.py).
+    """
+    key = normalize_query(text)
+    if url != AUTOCOMPLETE_URL:
+        key = f"{url}|{key}"
+    cached = _cache_get(key, ttl)
+    if cached is not None:
+        return cached
+
+    data = _fetch_autocomplete(text, timeout, url)
+
     if data and len(data) > 0:
         location_id = data[0].get('id')
         location_name = data[0].get('labels', [''])[0] if data[0].get('labels') else None
+        if location_id:
+            _cache_put(key, location_id, location_name)
         return location_id, location_name
     return None, None
 
@@ -63,4 +177,3 @@ if __name__ == "__main__":
     city = input("Ville à rechercher: ")
     id , name = location_autocomplete(city)
     print(id , name)
-
@@ -6,17 +6,15 @@ import streamlit as st
 from streamlit_extras.stylable_container import stylable_container
 from streamlit_autorefresh import st_autorefresh
 
-from scrapper import run_scraping, normalize_city
+from scrapper import run_scraping, normalize_city, CancelToken, STOP_FLAG
 from get_loc import location_autocomplete
+from storage import SegmentStore
 
 # ─────────────────────────────
 # CONFIG PAGE
 # ─────────────────────────────
 st.set_page_config(page_title="Scraping", page_icon="🏠", layout="centered")
 
-# Flag pour arrêter le scraping côté scraper
-STOP_FLAG = Path("stop_scraping.flag")
-
 # ─────────────────────────────
 # SESSION STATE INIT
 # ─────────────────────────────
@@ -34,6 +32,12 @@ if "scraping_city1_raw" not in st.session_state:
 
 if "scraping_city2_raw" not in st.session_state:
     st.session_state.scraping_city2_raw = None  # nom API pour affichage
+
+if "cancel_token" not in st.session_state:
+    st.session_state.cancel_token = None  # jeton d'arrêt du scraping en cours
+
+if "scraping_error" not in st.session_state:
+    st.session_state.scraping_error = None  # erreur du dernier scraping (affichée)
     
 # Rafraîchit toutes les 2 secondes (2000 ms)
 if st.session_state.is_scraping:
@@ -100,8 +104,12 @@ with col_btn[1]:
             """,
         ):
             if st.button("🛑 STOP", use_container_width=True, key="stop_btn"):
-                # On demande l'arrêt au scraper via le flag
-                STOP_FLAG.touch()
+                # On demande l'arrêt au scraper via le jeton partagé
+                if st.session_state.cancel_token is not None:
+                    st.session_state.cancel_token.cancel()
+                else:
+                    # session perdue : repli sur le flag fichier
+                    STOP_FLAG.touch()
                 # On indique à l'UI qu'on a demandé l'arrêt
                 st.session_state.is_scraping = False
                 st.rerun()
@@ -133,18 +141,28 @@ with col_btn[1]:
                     st.session_state.scraping_city1_raw = api_name1      # affichage humain
                     st.session_state.scraping_city2_raw = api_name2
                     st.session_state.is_scraping = True
+                    st.session_state.scraping_error = None
 
-                    # 4) effacer le flag d'arrêt si existant
+                    # 4) effacer le flag d'arrêt si existant + nouveau jeton
                     STOP_FLAG.unlink(missing_ok=True)
+                    cancel = CancelToken()
+                    st.session_state.cancel_token = cancel
 
                     # 5) préparer les villes pour le scraper (avec noms normalisés)
                     cities = {clean_name1: id1, clean_name2: id2}
 
                     # 6) lancer le scraping dans un thread
                     def scrape_thread():
-                        run_scraping(cities, size=30, max_page=100)
-                        # Quand le scraping est fini (ou stoppé), on met à jour l'état
-                        st.session_state.is_scraping = False
+                        try:
+                            run_scraping(cities, size=30, max_page=100, cancel=cancel)
+                        except KeyboardInterrupt:
+                            pass  # arrêt demandé via STOP
+                        except Exception as e:
+                            # erreur d'une ville (relevée par run_scraping) : affichée sur la page
+                            st.session_state.scraping_error = f"{type(e).__name__}: {e}"
+                        finally:
+                            # Quand le scraping est fini (ou stoppé), on met à jour l'état
+                            st.session_state.is_scraping = False
 
                     threading.Thread(target=scrape_thread, daemon=True).start()
 
@@ -162,19 +180,27 @@ if st.session_state.is_scraping:
     label2 = st.session_state.scraping_city2_raw or st.session_state.scraping_city2 or "?"
     st.success(f"✅ Scraping en cours: {label1} vs {label2}")
     st.info("Le scraping est actif...")
+elif st.session_state.scraping_error:
+    st.error(f"❌ Le scraping s'est arrêté sur une erreur : {st.session_state.scraping_error}")
 else:
     st.info("En attente de démarrage...")
 
 # ─────────────────────────────
 # FONCTION UTILITAIRE : comptage
 # ─────────────────────────────
+@st.cache_resource(show_spinner=False)
+def _city_store(city_path: str) -> SegmentStore:
+    # gardé entre les rafraîchissements : seul l'index ajouté depuis est relu
+    return SegmentStore(Path(city_path))
+
+
 def count_annonces(city_slug: str) -> int:
-    """Compte les JSON dans jsons/<city_slug>/annonces"""
+    """Compte les annonces stockées dans jsons/<city_slug>"""
     if not city_slug:
         return 0
-    city_path = Path("jsons") / city_slug / "annonces"
+    city_path = Path("jsons") / city_slug
     if city_path.exists():
-        return len(list(city_path.glob("*.json")))
+        return _city_store(str(city_path)).count()
     return 0
 
 # ─────────────────────────────
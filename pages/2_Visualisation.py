@@ -2,14 +2,17 @@ import streamlit as st
 import pandas as pd
 import pydeck as pdk
 import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import os 
 import json 
 
 from pathlib import Path
 from services.gpt_assistant import GPTAssistant
 from streamlit_extras.stylable_container import stylable_container
-from clean_data import SeLogerDataProcessor
 from config import get_city_coords
+from spatial_grid import ZOOM_CELLS, cell_for_zoom, empty_grid, price_colors
+from viz_cache import CACHE, city_frame, city_grid, city_summary, price_trends, scatter_density, scatter_points
 
 
 # -------------------------------------------------------------------
@@ -18,6 +21,11 @@ from config import get_city_coords
 st.set_page_config(page_title="Visualisation", page_icon="📊", layout="wide")
 st.title("📊 Visualisation des données")
 
+# Au-delà, les cartes n'affichent que la grille agrégée (pas un point par annonce)
+MAP_MAX_POINTS = int(os.environ.get("VIZ_MAP_MAX_POINTS", 5000))
+# Au-delà, le nuage prix / surface passe en WebGL sur un échantillon
+SCATTER_MAX_POINTS = int(os.environ.get("VIZ_SCATTER_MAX_POINTS", 10000))
+
 
 # -------------------------------------------------------------------
 # FONCTION POUR RÉCUPÉRER LES VILLES SCRAPÉES
@@ -78,18 +86,13 @@ with col4:
     ):
         if st.button("Visualiser", use_container_width=True, key="viz_btn"):
 
-            processor = SeLogerDataProcessor()
-
-            # Nettoyage ville 1
-            with st.spinner(f"Nettoyage des données pour {city1}..."):
-                df1 = processor.run(city_name=city1, output_path=f"data/{city1}_clean.csv")
-
-            # Nettoyage ville 2
-            with st.spinner(f"Nettoyage des données pour {city2}..."):
-                df2 = processor.run(city_name=city2, output_path=f"data/{city2}_clean.csv")
+            # Nettoyage (ou cache partagé entre sessions si les JSON n'ont pas changé)
+            for city in (city1, city2):
+                with st.spinner(f"Nettoyage des données pour {city}..."):
+                    city_summary(city)
 
-            st.session_state.df_city1 = df1
-            st.session_state.df_city2 = df2
+            # Seuls les noms sont gardés par session, résumés et DataFrames sont dans viz_cache
+            st.session_state.viz_cities = (city1, city2)
             st.session_state.show_viz = True
             st.success("Données nettoyées !")
 
@@ -101,31 +104,36 @@ st.markdown("---")
 # -------------------------------------------------------------------
 # FONCTION CARTE PYDECK
 # -------------------------------------------------------------------
-def make_map(df_city, lat, lon, title):
+def make_map(grid, df_city, summary, lat, lon, title, zoom=11):
     st.markdown(f"### 🗺️ {title}")
 
-    # Normaliser couleur prix
-    p_min, p_max = df_city["price_m2"].min(), df_city["price_m2"].max()
-
-    def price_to_color(p):
-        t = (p - p_min) / (p_max - p_min + 1e-9)
-        return [
-            int(255 * t),
-            int(30 * (1 - t)),
-            int(255 * (1 - t)),
-            255
-        ]
-
-    df_city["color"] = df_city["price_m2"].apply(price_to_color)
+    # Mailles précalculées au nettoyage (spatial_grid.py) pour ce zoom
+    cell_m = cell_for_zoom(zoom)
+    if grid is None:
+        st.caption("⚠️ Grille précalculée absente ou illisible : carte sans mailles")
+    cells = grid[grid["cell_m"] == cell_m] if grid is not None else empty_grid()
+
+    # Échelle de couleur commune mailles / points : déciles du prix au m² de la ville
+    p_min, p_max = summary["price_m2"]["q10"], summary["price_m2"]["q90"]
+    if p_min is None or p_max is None:
+        st.info("ℹ️ Aucun prix au m² pour cette ville : carte non disponible")
+        return
+    cells = cells.assign(
+        color=price_colors(cells["median_price_m2"], p_min, p_max).tolist(),
+        tooltip=(
+            "<b>Prix/m² médian:</b> " + cells["median_price_m2"].round(0).astype(str)
+            + " €<br><b>Biens:</b> " + cells["count"].astype(str)
+        ),
+    )
 
- # ---------------------------
-    # 1. HEATMAP LAYER
+    # ---------------------------
+    # 1. HEATMAP LAYER (centres de mailles)
     # ---------------------------
     heat = pdk.Layer(
         "HeatmapLayer",
-        df_city,
+        cells[["lon", "lat", "median_price_m2"]],
         get_position='[lon, lat]',
-        get_weight="price_m2",
+        get_weight="median_price_m2",
         aggregation="MEAN",
         color_range=[
             [0, 0, 30],
@@ -140,18 +148,50 @@ def make_map(df_city, lat, lon, title):
     )
 
     # ---------------------------
-    # 2. SCATTER LAYER
+    # 2. GRILLE (médiane + effectif par maille)
     # ---------------------------
-    points = pdk.Layer(
-        "ScatterplotLayer",
-        df_city,
-        get_position='[lon, lat]',
+    show_points = df_city is not None and len(df_city) <= MAP_MAX_POINTS
+    grid_layer = pdk.Layer(
+        "GridCellLayer",
+        cells[["lon0", "lat0", "count", "color", "tooltip"]],
+        get_position='[lon0, lat0]',
+        cell_size=cell_m,
         get_fill_color="color",
-        get_radius=30,
-        stroked=False,
-        opacity=1,
-        pickable=True,
+        get_elevation="count",
+        elevation_scale=3,
+        extruded=True,
+        opacity=0.25 if show_points else 0.8,
+        pickable=not show_points,
     )
+    layers = [heat, grid_layer]
+
+    # ---------------------------
+    # 3. SCATTER LAYER (seulement sous le seuil MAP_MAX_POINTS)
+    # ---------------------------
+    if show_points:
+        pts = df_city.loc[df_city["lon"].notna() & df_city["lat"].notna(), ["lon", "lat", "price_m2", "livingSpace"]]
+        pts = pts.assign(
+            color=price_colors(pts["price_m2"], p_min, p_max).tolist(),
+            tooltip=(
+                "<b>Prix/m²:</b> " + pts["price_m2"].round(0).astype(str)
+                + " €<br><b>Surface:</b> " + pts["livingSpace"].astype(str) + " m²"
+            ),
+        )
+        layers.append(pdk.Layer(
+            "ScatterplotLayer",
+            pts,
+            get_position='[lon, lat]',
+            get_fill_color="color",
+            get_radius=30,
+            stroked=False,
+            opacity=1,
+            pickable=True,
+        ))
+    else:
+        st.caption(
+            f"{summary['properties']} biens agrégés en {len(cells)} mailles de {cell_m} m "
+            f"(points individuels au-delà de {MAP_MAX_POINTS} biens masqués)"
+        )
 
     # ---------------------------
     # VIEW
@@ -159,7 +199,7 @@ def make_map(df_city, lat, lon, title):
     view_state = pdk.ViewState(
         latitude=lat,
         longitude=lon,
-        zoom=11,
+        zoom=zoom,
         pitch=45,
         bearing=20,
     )
@@ -168,11 +208,11 @@ def make_map(df_city, lat, lon, title):
     # RENDER
     # ---------------------------
     r = pdk.Deck(
-        layers=[heat, points],
+        layers=layers,
         initial_view_state=view_state,
         # map_style="mapbox://styles/mapbox/dark-v11",
         tooltip={
-            "html": "<b>Prix/m²:</b> {price_m2} €<br><b>Surface:</b> {livingSpace} m²",
+            "html": "{tooltip}",
             "style": {"color": "white"}
         }
     )
@@ -185,26 +225,52 @@ def make_map(df_city, lat, lon, title):
 # -------------------------------------------------------------------
 if st.session_state.get("show_viz", False):
 
-    df1 = st.session_state.df_city1
-    df2 = st.session_state.df_city2
+    city1, city2 = st.session_state.viz_cities
+
+    # Résumés calculés au nettoyage (summary.py), partagés entre sessions :
+    # cache hit = deux stat, sinon nettoyage incrémental
+    with st.spinner("Chargement des données..."):
+        summary1, report1, hit1 = city_summary(city1)
+        summary2, report2, hit2 = city_summary(city2)
+
+    missing = [c for c, summary in ((city1, summary1), (city2, summary2)) if summary is None]
+    if missing:
+        st.warning(f"⚠️ Aucune annonce nettoyée pour : {', '.join(missing)}")
+        st.stop()
 
     st.success(f"📊 Visualisation : {city1} vs {city2}")
+
+    # ----------------------------------------------
+    # 🛠️ Debug : instrumentation du nettoyage (pipeline_report.py)
+    # ----------------------------------------------
+    reports = {city1: (report1, hit1), city2: (report2, hit2)}
+    with st.expander("🛠️ Debug — étapes du nettoyage", expanded=False):
+        st.caption(f"Cache partagé : {CACHE.stats()}")
+        for city, (report, hit) in reports.items():
+            st.markdown(
+                f"**{city}** — mode `{report.get('mode')}`{' (cache)' if hit else ''}, "
+                f"{report['total_seconds']} s, pic RSS du process {report['rss_peak_mb']} Mo"
+            )
+            st.dataframe(pd.DataFrame(report["stages"]), use_container_width=True, hide_index=True)
+            if report["errors"]:
+                st.warning(f"{sum(e['count'] for e in report['errors'])} erreur(s) de parsing")
+                st.json(report["errors"], expanded=False)
         # ----------------------------------------------
     # 📊 Aperçu global : répartition + métriques
     # ----------------------------------------------
     st.header("📊 Aperçu global des deux villes")
 
-    # Nombre d'annonces
-    count1 = len(df1)
-    count2 = len(df2)
+    # Nombre de biens (un par dup_cluster)
+    count1 = summary1["properties"]
+    count2 = summary2["properties"]
 
     # Prix médian
-    median1 = df1["price_m2"].median()
-    median2 = df2["price_m2"].median()
+    median1 = summary1["price_m2"]["q50"]
+    median2 = summary2["price_m2"]["q50"]
 
     # Prix moyen
-    mean1 = df1["price_m2"].mean()
-    mean2 = df2["price_m2"].mean()
+    mean1 = summary1["price_m2"]["mean"]
+    mean2 = summary2["price_m2"]["mean"]
 
     # --- Mise en page ---
     colA, colB = st.columns([1, 2])
@@ -252,98 +318,95 @@ if st.session_state.get("show_viz", False):
     # Scatter Plot – Prix/m² vs Surface
     # ----------------------------------------------
     st.header("📉 Prix au m² selon la surface — Comparaison")
-    df_all = pd.concat([df1.assign(city=city1), df2.assign(city=city2)])
 
-    fig = px.scatter(
-        df_all,
-        x="livingSpace",
-        y="price_m2",
-        color="city",
-        opacity=0.7,
-        labels={
-            "livingSpace": "Surface (m²)",
-            "price_m2": "Prix au m² (€)",
-            "city": "Ville"
-        },
-        title="Prix au mètre carré en fonction de la surface",
-        color_discrete_map={
-        city1: "#ffa64d",  
-        city2: "#66b3ff", 
-    }
+    # Au-delà de SCATTER_MAX_POINTS : WebGL + échantillon stratifié (extrêmes gardés),
+    # ou densité 2D calculée côté serveur (scatter_sampling.py)
+    n_points = summary1["properties"] + summary2["properties"]
+    render = st.radio(
+        "Rendu", options=["Auto", "Tous les points", "Densité"], horizontal=True,
+        help=f"Auto : tous les points jusqu'à {SCATTER_MAX_POINTS}, échantillon au-delà.",
     )
+    colors = {city1: "#ffa64d", city2: "#66b3ff"}
+
+    if render == "Densité":
+        density = scatter_density([city1, city2])
+        fig = make_subplots(rows=1, cols=2, shared_yaxes=True, subplot_titles=[city1, city2])
+        for i, city in enumerate((city1, city2), start=1):
+            grid = density[city]
+            fig.add_trace(
+                go.Heatmap(z=grid["z"], x=grid["x"], y=grid["y"], colorscale="Viridis",
+                           showscale=i == 2, hovertemplate="%{z} biens<extra></extra>"),
+                row=1, col=i,
+            )
+            fig.update_xaxes(title_text="Surface (m²)", row=1, col=i)
+        fig.update_yaxes(title_text="Prix au m² (€)", row=1, col=1)
+        fig.update_layout(title="Densité des biens : prix au m² en fonction de la surface")
+        caption = f"{n_points} biens agrégés en grille {len(grid['x'])}×{len(grid['y'])}"
+    else:
+        max_points = SCATTER_MAX_POINTS if render == "Auto" else n_points
+        df_all, info = scatter_points([city1, city2], max_points)
+        webgl = info["shown"] > SCATTER_MAX_POINTS or info["shown"] < info["rows"]
+
+        fig = px.scatter(
+            df_all,
+            x="livingSpace",
+            y="price_m2",
+            color="city",
+            opacity=0.7,
+            render_mode="webgl" if webgl else "svg",
+            labels={
+                "livingSpace": "Surface (m²)",
+                "price_m2": "Prix au m² (€)",
+                "city": "Ville"
+            },
+            title="Prix au mètre carré en fonction de la surface",
+            color_discrete_map=colors,
+        )
+        fig.update_traces(marker=dict(size=8 if not webgl else 5))
+        caption = f"{info['shown']} points affichés sur {info['rows']}"
+        if info["shown"] < info["rows"]:
+            caption += f" (échantillon stratifié par ville, {info['outliers']} valeurs extrêmes conservées)"
+        caption += f" — rendu {'WebGL' if webgl else 'SVG'}"
 
-    fig.update_traces(marker=dict(size=8))
     fig.update_layout(height=500)
+    payload_kb = len(fig.to_json()) / 1024
+    st.caption(f"{caption} — {payload_kb:,.0f} Ko envoyés au navigateur")
 
     st.plotly_chart(fig, use_container_width=True)
 
     # ----------------------------------------------
-    # Évolution du PRIX MÉDIAN au m² dans le temps (hebdo + smoothing)
+    # Évolution du PRIX MÉDIAN au m² dans le temps (jour / semaine / mois + lissage)
     # ----------------------------------------------
     st.header("📈 Évolution du prix MÉDIAN au m² dans le temps")
 
-    # Choisir la meilleure colonne date
-    date_col1 = "update_date" if "update_date" in df1.columns else "creation_date"
-    date_col2 = "update_date" if "update_date" in df2.columns else "creation_date"
-
-    # Conversion en datetime
-    df1[date_col1] = pd.to_datetime(df1[date_col1], errors="coerce")
-    df2[date_col2] = pd.to_datetime(df2[date_col2], errors="coerce")
-
-    # Suppression dates invalides
-    df1 = df1.dropna(subset=[date_col1])
-    df2 = df2.dropna(subset=[date_col2])
-
-    # Tri obligatoire
-    df1 = df1.sort_values(date_col1)
-    df2 = df2.sort_values(date_col2)
-
     # ------------------------
-    # 1️⃣ Regroupement HEBDOMADAIRE
+    # 1️⃣ Granularité + fenêtre de lissage (séries précalculées, timeseries.py)
     # ------------------------
-    df1["week"] = df1[date_col1].dt.to_period("W").apply(lambda r: r.start_time)
-    df2["week"] = df2[date_col2].dt.to_period("W").apply(lambda r: r.start_time)
-
-    weekly1 = (
-        df1.groupby("week")["price_m2"]
-            .median()
-            .reset_index()
-            .rename(columns={"price_m2": "median_price_m2"})
-    )
-    weekly1["city"] = city1
-
-    weekly2 = (
-        df2.groupby("week")["price_m2"]
-            .median()
-            .reset_index()
-            .rename(columns={"price_m2": "median_price_m2"})
-    )
-    weekly2["city"] = city2
-
-    weekly_all = pd.concat([weekly1, weekly2], ignore_index=True)
+    GRANULARITIES = {"W": ("Semaine", "hebdomadaire"), "D": ("Jour", "quotidien"), "M": ("Mois", "mensuel")}
+    colG, colW = st.columns(2)
+    with colG:
+        freq = st.radio("Granularité", options=list(GRANULARITIES), horizontal=True,
+                        format_func=lambda f: GRANULARITIES[f][0])
+    with colW:
+        window = st.slider("Lissage (médiane glissante, périodes)", min_value=1, max_value=7, value=3)
 
     # ------------------------
-    # 2️⃣ Lissage Rolling-Median (fenêtre 3 semaines)
+    # 2️⃣ Séries des deux villes (un seul DataFrame, mis en cache par version des données)
     # ------------------------
-    weekly_all["smooth"] = (
-        weekly_all
-        .sort_values("week")
-        .groupby("city")["median_price_m2"]
-        .transform(lambda s: s.rolling(window=3, center=True, min_periods=1).median())
-    )
+    trends = price_trends([city1, city2], freq, window)
 
     # ------------------------
     # Graphique
     # ------------------------
     fig_weekly = px.line(
-        weekly_all,
-        x="week",
+        trends,
+        x="period",
         y="smooth",  # courbe lissée
         color="city",
         markers=False,
-        title="Évolution du prix MÉDIAN au m² (hebdomadaire, lissé)",
+        title=f"Évolution du prix MÉDIAN au m² ({GRANULARITIES[freq][1]}, lissé)",
         labels={
-            "week": "Semaine",
+            "period": GRANULARITIES[freq][0],
             "smooth": "Prix médian au m² (€)",
             "city": "Ville"
         },
@@ -357,6 +420,30 @@ if st.session_state.get("show_viz", False):
 
     st.plotly_chart(fig_weekly, use_container_width=True)
 
+    # ----------------------------------------------
+    # 📏 Répartition des surfaces (histogramme du résumé)
+    # ----------------------------------------------
+    st.header("📏 Répartition des surfaces")
+    hist_all = pd.concat([
+        pd.DataFrame({
+            "surface": summary["surface_hist"]["edges"][:-1],
+            "annonces": summary["surface_hist"]["counts"],
+            "city": city,
+        })
+        for city, summary in ((city1, summary1), (city2, summary2))
+    ])
+    fig_hist = px.bar(
+        hist_all,
+        x="surface",
+        y="annonces",
+        color="city",
+        barmode="group",
+        labels={"surface": "Surface (m², classes de 5)", "annonces": "Biens", "city": "Ville"},
+        color_discrete_map={city1: "#ffa64d", city2: "#66b3ff"},
+    )
+    fig_hist.update_layout(height=350)
+    st.plotly_chart(fig_hist, use_container_width=True)
+
 
 
 
@@ -364,17 +451,23 @@ if st.session_state.get("show_viz", False):
     # CARTES PYDECK — 1 colonne ou 2 colonnes
     # ----------------------------------------------
     st.header("🗺️ Cartes — Vue géographique des biens")
+
+    # Annonces une par une seulement si la carte affiche les points (sinon grille seule)
+    df1 = city_frame(city1)[0] if summary1["properties"] <= MAP_MAX_POINTS else None
+    df2 = city_frame(city2)[0] if summary2["properties"] <= MAP_MAX_POINTS else None
+    zoom = st.select_slider("Zoom (taille des mailles)", options=list(ZOOM_CELLS), value=11,
+                            format_func=lambda z: f"{z} — {ZOOM_CELLS[z]} m")
     colA, colB = st.columns(2)
 
     # Carte ville 1
     with colA:
         coords1 = get_city_coords(city1)
-        make_map(df1, coords1["lat"], coords1["lon"], city1)
+        make_map(city_grid(city1), df1, summary1, coords1["lat"], coords1["lon"], city1, zoom)
 
     # Carte ville 2
     with colB:
         coords2 = get_city_coords(city2)
-        make_map(df2, coords2["lat"], coords2["lon"], city2)
+        make_map(city_grid(city2), df2, summary2, coords2["lat"], coords2["lon"], city2, zoom)
         
     # -------------------------------------------------------------------
     # 🤖 ASSISTANT IA — Analyse automatique
@@ -420,21 +513,20 @@ if st.session_state.get("show_viz", False):
         }
 
         # Tendances hebdomadaires lissées
-        weekly_city1 = weekly1["median_price_m2"].tolist()
-        weekly_city2 = weekly2["median_price_m2"].tolist()
+        weekly = price_trends([city1, city2], "W", 3)
+        weekly_city1 = weekly.loc[weekly["city"] == city1, "median"].tolist()
+        weekly_city2 = weekly.loc[weekly["city"] == city2, "median"].tolist()
 
         # -----------------------------
         # 2️⃣ Résumé géographique simple
         # -----------------------------
         geo_city1 = {
-            "lat_mean": float(df1["lat"].mean()),
-            "lon_mean": float(df1["lon"].mean()),
+            **summary1.get("geo", {}),
             "prix_median": float(median1)
         }
 
         geo_city2 = {
-            "lat_mean": float(df2["lat"].mean()),
-            "lon_mean": float(df2["lon"].mean()),
+            **summary2.get("geo", {}),
             "prix_median": float(median2)
         }
 
@@ -0,0 +1,136 @@
+"""
+Instrumentation du pipeline de nettoyage : durée, mémoire (RSS) et
+lignes entrée/sortie par étape, erreurs de parsing agrégées par type.
+Le rapport est un dict JSON (écrit à côté de la sortie nettoyée et
+affiché dans l'expander debug de la page Visualisation).
+"""
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+import psutil
+
+from storage import atomic_write_text
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _rss_mb() -> float:
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def _peak_rss_mb(who: str = "self") -> float | None:
+    """
+    Pic RSS réel (ru_maxrss) du process depuis son démarrage, ou du plus
+    gros process enfant terminé (who="children" : workers de l'ingestion).
+    """
+    if resource is None:
+        if who != "self":
+            return None
+        return getattr(psutil.Process().memory_info(), "peak_wset", 0) / 2**20
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    return usage.ru_maxrss / 2**20 if sys.platform == "darwin" else usage.ru_maxrss / 2**10  # octets vs Ko
+
+
+class PipelineReport:
+    """Rapport d'une exécution (run) du pipeline, étape par étape."""
+
+    MAX_SAMPLES = 5  # exemples d'erreurs conservés par type
+
+    def __init__(self, name: str = "") -> None:
+        self.name = name
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.stages: List[Dict[str, Any]] = []
+        self.errors: Dict[str, Dict[str, Any]] = {}
+        self.info: Dict[str, Any] = {}
+        self._start = time.perf_counter()
+        self._rss_start = _rss_mb()
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int | None = None):
+        """
+        Mesure une étape. Le dict produit peut être complété dans le bloc
+        (rows_out, infos propres à l'étape) :
+
+            with report.stage("dates", rows_in=len(df)) as s:
+                ...
+                s["rows_out"] = len(df)
+        """
+        record: Dict[str, Any] = {"stage": name, "rows_in": rows_in, "rows_out": None}
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            rss_after = _rss_mb()
+            record["seconds"] = round(time.perf_counter() - start, 4)
+            record["rss_mb"] = round(rss_after, 1)
+            record["rss_delta_mb"] = round(rss_after - rss_before, 1)
+            if record["rows_out"] is None:
+                record["rows_out"] = rows_in
+            self.stages.append(record)
+
+    def add_stage(self, name: str, seconds: float, rows_in=None, rows_out=None, **extra) -> None:
+        """Étape mesurée ailleurs (ex. cumul par annonce, workers)."""
+        self.stages.append({
+            "stage": name,
+            "rows_in": rows_in,
+            "rows_out": rows_out,
+            "seconds": round(seconds, 4),
+            "rss_mb": None,
+            "rss_delta_mb": None,
+            **extra,
+        })
+
+    def error(self, stage: str, error_type: str, message: str, source: str | None = None) -> None:
+        """Compte une erreur par (étape, type) et garde quelques exemples."""
+        key = f"{stage}:{error_type}"
+        entry = self.errors.setdefault(
+            key, {"stage": stage, "type": error_type, "count": 0, "samples": []}
+        )
+        entry["count"] += 1
+        if len(entry["samples"]) < self.MAX_SAMPLES:
+            entry["samples"].append({"source": source, "message": message[:300]})
+
+    @property
+    def error_count(self) -> int:
+        return sum(e["count"] for e in self.errors.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        # pic du process entier : dans un serveur long (Streamlit) il peut
+        # dater d'une exécution précédente
+        workers_peak = _peak_rss_mb("children")
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "total_seconds": round(time.perf_counter() - self._start, 4),
+            "rss_start_mb": round(self._rss_start, 1),
+            "rss_peak_mb": round(_peak_rss_mb(), 1),
+            "rss_peak_workers_mb": None if workers_peak is None else round(workers_peak, 1),
+            **self.info,
+            "stages": self.stages,
+            "errors": list(self.errors.values()),
+        }
+
+    def save(self, path: Path) -> None:
+        atomic_write_text(Path(path), json.dumps(self.to_dict(), indent=2, ensure_ascii=False))
+
+    def summary(self) -> str:
+        """Tableau texte court pour la console."""
+        lines = [f"{'étape':<14}{'lignes':>16}{'s':>9}{'Δ RSS Mo':>10}"]
+        for s in self.stages:
+            rows = f"{s['rows_in'] if s['rows_in'] is not None else '-'}→{s['rows_out'] if s['rows_out'] is not None else '-'}"
+            delta = "-" if s["rss_delta_mb"] is None else s["rss_delta_mb"]
+            lines.append(f"{s['stage']:<14}{rows:>16}{s['seconds']:>9}{delta:>10}")
+        if self.errors:
+            detail = ", ".join(f"{e['type']}: {e['count']}" for e in self.errors.values())
+            lines.append(f"❌ {self.error_count} erreur(s) — {detail}")
+        return "\n".join(lines)
@@ -0,0 +1,155 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+# -------------------------------------------------------------------------
+# UTILITAIRES
+# -------------------------------------------------------------------------
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Convertit un header Retry-After (secondes ou date HTTP) en secondes."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+# -------------------------------------------------------------------------
+# INTERFACE
+# -------------------------------------------------------------------------
+
+class RateLimiter:
+    """
+    Interface d'un limiteur de débit branché dans HttpClient.
+    - acquire(host) : bloque jusqu'à ce qu'une requête vers host soit permise
+    - success(host) : la réponse s'est bien passée
+    - backoff(host, retry_after) : le serveur est sous pression (429/5xx/timeout)
+    """
+
+    def acquire(self, host: str) -> None:
+        pass
+
+    def success(self, host: str) -> None:
+        pass
+
+    def backoff(self, host: str, retry_after: float | None = None) -> None:
+        pass
+
+
+# -------------------------------------------------------------------------
+# TOKEN BUCKET PAR HÔTE + AIMD
+# -------------------------------------------------------------------------
+
+@dataclass
+class _Bucket:
+    rate: float
+    tokens: float
+    last: float = field(default_factory=time.monotonic)
+    blocked_until: float = 0.0
+    last_decrease: float = float("-inf")
+    last_increase: float = field(default_factory=time.monotonic)
+
+    def refill(self, now: float, capacity: float) -> None:
+        if now > self.last:
+            self.tokens = min(capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    Token bucket par hôte dont le débit s'adapte (AIMD) :
+    - hausse additive de `increase` req/s par seconde de succès continus
+    - baisse multiplicative (× `decrease`) sur 429/5xx/timeout
+    - pause complète de l'hôte pendant la durée indiquée par Retry-After
+    Les requêtes en vol échouent souvent ensemble : une seule baisse est
+    appliquée par fenêtre de `cooldown` secondes pour ne pas diviser le
+    débit autant de fois qu'il y a de workers.
+    Thread-safe, une seule instance est partagée par tous les scrapers.
+    """
+
+    def __init__(
+        self,
+        rate: float = 2.0,
+        min_rate: float = 0.2,
+        max_rate: float = 8.0,
+        burst: float = 2.0,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+    ) -> None:
+        self.initial_rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self._buckets: dict[str, _Bucket] = {}
+
+    def _bucket(self, host: str) -> _Bucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = _Bucket(rate=self.initial_rate, tokens=self.burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    def rate(self, host: str) -> float:
+        """Débit courant (req/s) autorisé pour un hôte."""
+        with self._lock:
+            return self._bucket(host).rate
+
+    def acquire(self, host: str) -> None:
+        while True:
+            with self._lock:
+                bucket = self._bucket(host)
+                now = time.monotonic()
+                if now < bucket.blocked_until:
+                    wait = bucket.blocked_until - now
+                else:
+                    bucket.refill(now, self.burst)
+                    if bucket.tokens >= 1:
+                        bucket.tokens -= 1
+                        return
+                    wait = (1 - bucket.tokens) / bucket.rate
+            # on attend hors verrou pour ne pas bloquer les autres hôtes
+            time.sleep(wait)
+
+    def success(self, host: str) -> None:
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            # hausse proportionnelle au temps écoulé (bornée à 1 s après une pause)
+            elapsed = min(1.0, max(0.0, now - bucket.last_increase))
+            bucket.rate = min(self.max_rate, bucket.rate + self.increase * elapsed)
+            bucket.last_increase = now
+
+    def backoff(self, host: str, retry_after: float | None = None) -> None:
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            bucket.refill(now, self.burst)
+            if now - bucket.last_decrease >= self.cooldown:
+                bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+                bucket.last_decrease = now
+            bucket.tokens = min(bucket.tokens, 0.0)
+            if retry_after:
+                bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+                # les jetons ne s'accumulent pas pendant la pause
+                bucket.last = bucket.blocked_until
+            # la remontée du débit repart de la fin de la pause
+            bucket.last_increase = max(now, bucket.blocked_until)
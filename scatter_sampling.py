@@ -0,0 +1,95 @@
+"""
+Nuage prix au m² / surface pour de gros volumes d'annonces.
+
+Au-delà d'un seuil de points, la page Visualisation bascule en WebGL et
+n'envoie qu'un échantillon :
+- stratifié par ville (même fraction partout → densités conservées)
+- toutes les valeurs extrêmes (règle de Tukey, par ville) gardées en plus
+
+Variante : densité 2D calculée côté serveur (histogramme, grille commune
+aux villes) — la taille envoyée ne dépend plus du nombre d'annonces.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+SCATTER_COLS = ("livingSpace", "price_m2")
+
+
+def outlier_mask(df: pd.DataFrame, cols=SCATTER_COLS, by: str = "city", k: float = 1.5) -> pd.Series:
+    """Lignes hors [Q1 - k·IQR, Q3 + k·IQR] sur l'une des colonnes, quartiles par ville."""
+    mask = pd.Series(False, index=df.index)
+    for col in cols:
+        if by in df.columns:
+            grouped = df.groupby(by, observed=True, sort=False)[col]
+            q1, q3 = grouped.transform("quantile", 0.25), grouped.transform("quantile", 0.75)
+        else:
+            q1, q3 = df[col].quantile(0.25), df[col].quantile(0.75)
+        iqr = q3 - q1
+        mask |= (df[col] < q1 - k * iqr) | (df[col] > q3 + k * iqr)
+    return mask
+
+
+def downsample(
+    df: pd.DataFrame,
+    max_points: int,
+    by: str = "city",
+    cols=SCATTER_COLS,
+    seed: int = 0,
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    (échantillon, infos). Les valeurs extrêmes sont toujours gardées ; le
+    reste est tiré avec la même fraction dans chaque ville pour tenir dans
+    `max_points` au total (plus les extrêmes s'ils dépassent le budget).
+    """
+    df = df.dropna(subset=list(cols))
+    info = {"rows": len(df), "shown": len(df), "outliers": 0}
+    if len(df) <= max_points:
+        return df, info
+
+    extreme = outlier_mask(df, cols, by)
+    rest = df[~extreme]
+    budget = max(max_points - int(extreme.sum()), 0)
+    frac = min(1.0, budget / len(rest)) if len(rest) else 0.0
+    if by in rest.columns:
+        sample = rest.groupby(by, observed=True, group_keys=False).sample(frac=frac, random_state=seed)
+    else:
+        sample = rest.sample(frac=frac, random_state=seed)
+
+    out = pd.concat([sample, df[extreme]])
+    info.update(shown=len(out), outliers=int(extreme.sum()))
+    return out, info
+
+
+def density_grid(
+    df: pd.DataFrame,
+    bins: int = 80,
+    by: str = "city",
+    cols=SCATTER_COLS,
+    clip: Tuple[float, float] = (0.005, 0.995),
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Histogramme 2D par ville sur une grille commune ({ville: {z, x, y}},
+    x/y = centres des classes). Les bornes excluent les 0,5 % extrêmes de
+    chaque axe pour que quelques valeurs aberrantes n'écrasent pas la grille.
+    """
+    x_col, y_col = cols
+    df = df.dropna(subset=list(cols))
+    x_range = df[x_col].quantile(list(clip)).to_numpy()
+    y_range = df[y_col].quantile(list(clip)).to_numpy()
+    x_edges = np.linspace(x_range[0], x_range[1], bins + 1)
+    y_edges = np.linspace(y_range[0], y_range[1], bins + 1)
+
+    groups = df.groupby(by, observed=True, sort=False) if by in df.columns else [(None, df)]
+    out = {}
+    for key, part in groups:
+        z, _, _ = np.histogram2d(part[x_col], part[y_col], bins=(x_edges, y_edges))
+        out[key] = {
+            "z": z.T,   # lignes = y, colonnes = x (convention heatmap)
+            "x": (x_edges[:-1] + x_edges[1:]) / 2,
+            "y": (y_edges[:-1] + y_edges[1:]) / 2,
+        }
+    return out
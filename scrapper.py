@@ -1,12 +1,19 @@
 import json
-import random
 import time
+import threading
 import requests
-import subprocess
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+
+from rate_limiter import AdaptiveRateLimiter, RateLimiter, parse_retry_after
+from cookie_manager import get_cookie_manager
+from storage import CrawlCheckpoint, SegmentStore, atomic_write_text
 
 
 # -------------------------------------------------------------------------
@@ -22,9 +29,19 @@ def normalize_city(name: str) -> str:
 
 
 def save_json(data: Dict[str, Any], path: Path) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    atomic_write_text(path, json.dumps(data, indent=2, ensure_ascii=False))
     
+def parse_date(value: str | None) -> datetime | None:
+    """Parse une date ISO SeLoger ('2025-10-14T00:20:10.221Z')."""
+    if not value:
+        return None
+    try:
+        date = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+    return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+
 def get_last_scraped_page(city_slug: str) -> int:
     pages_dir = Path("jsons") / city_slug / "pages"
     if not pages_dir.exists():
@@ -39,8 +56,93 @@ def get_last_scraped_page(city_slug: str) -> int:
     return max(pages) if pages else 0
 
 
+# Limiteur partagé par tous les scrapers du process
+DEFAULT_RATE_LIMITER = AdaptiveRateLimiter()
+
+
+# -------------------------------------------------------------------------
+# ARRÊT DU SCRAPING
+# -------------------------------------------------------------------------
+
+STOP_FLAG = Path("stop_scraping.flag")
+
+
+class CancelToken:
+    """
+    Jeton d'arrêt partagé entre les workers.
+    - cancel() : arrêt immédiat depuis le même process (page Streamlit)
+    - fichier STOP_FLAG : repli inter-process, relu au plus toutes les
+      `poll_interval` secondes au lieu d'un stat par annonce
+    """
+
+    def __init__(self, flag_path: Path = STOP_FLAG, poll_interval: float = 2.0) -> None:
+        self.flag_path = Path(flag_path)
+        self.poll_interval = poll_interval
+        self._event = threading.Event()
+        self._last_poll = float("-inf")
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def is_cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        now = time.monotonic()
+        if now - self._last_poll >= self.poll_interval:
+            self._last_poll = now
+            if self.flag_path.exists():
+                self._event.set()
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self.is_cancelled():
+            raise KeyboardInterrupt("Stop requested")
+
+
+# -------------------------------------------------------------------------
+# MÉTRIQUES DE REQUÊTES (benchmarks)
+# -------------------------------------------------------------------------
+
+class RequestMetrics:
+    """Latences et retries collectés par HttpClient (optionnel, thread-safe)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: list[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.retries: Dict[str, int] = {}
+
+    def record(self, latency: float, status: int) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def retry(self, reason: str) -> None:
+        with self._lock:
+            self.retries[reason] = self.retries.get(reason, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = sorted(self.latencies)
+            statuses = dict(self.statuses)
+            retries = dict(self.retries)
+
+        def pct(q: float) -> float | None:
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 1)
+
+        return {
+            "requests": len(lat),
+            "latency_p50_ms": pct(0.50),
+            "latency_p99_ms": pct(0.99),
+            "statuses": statuses,
+            "retries": retries,
+        }
+
+
 # -------------------------------------------------------------------------
-# HTTP CLIENT (avec cookies + retry + délai)
+# HTTP CLIENT (avec cookies + retry + limiteur de débit)
 # -------------------------------------------------------------------------
 
 class HttpClient:
@@ -48,59 +150,55 @@ class HttpClient:
         self,
         cookie_path: str,
         base_headers: Dict[str, str],
-        min_delay: float = 1.2,
-        max_delay: float = 3.5,
+        rate_limiter: RateLimiter | None = None,
         max_retries: int = 3,
         retry_delay: float = 2.0,
+        pool_size: int = 10,
+        timeout: float = 30,
+        metrics: RequestMetrics | None = None,
     ) -> None:
-        self.cookie_path = Path(cookie_path)
-        self.base_headers = base_headers
-        self.min_delay = min_delay
-        self.max_delay = max_delay
+        self.rate_limiter = rate_limiter or DEFAULT_RATE_LIMITER
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.metrics = metrics
 
+        # pool de connexions dimensionné pour les requêtes concurrentes
         self.session = requests.Session()
-        self._cookie_cache: str | None = None
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
-    # ---- cookies ----
-    def _load_cookie(self, force_reload: bool = False) -> str:
-        """
-        Charge le cookie depuis le fichier.
-        Si le fichier n'existe pas, lance get_cookie.py une seule fois.
-        """
-        if self._cookie_cache is None or force_reload:
-            if not self.cookie_path.exists():
-                print("⚠️ Cookies introuvables, lancement de get_cookie.py...")
-                self._refresh_cookie()
-                if not self.cookie_path.exists():
-                    raise FileNotFoundError(
-                        f"Échec création cookies: {self.cookie_path}"
-                    )
-
-            with self.cookie_path.open(encoding="utf-8") as f:
-                cookies = json.load(f)
-
-            self._cookie_cache = "; ".join(
-                f"{c['name']}={c['value']}" for c in cookies
-            )
-        return self._cookie_cache
+        # headers fixes posés une fois sur la session, cookies dans son jar
+        self.session.headers.update(base_headers)
+        self.cookies = get_cookie_manager(cookie_path)
+        self._cookie_gen: int | None = None
+        self._cookie_lock = threading.Lock()
 
-    def _refresh_cookie(self) -> None:
-        """Appelle get_cookie.py et invalide le cache."""
-        print("🔑 Refresh cookie via get_cookie.py...")
-        subprocess.run(["python3", "get_cookie.py"], check=True)
-        self._cookie_cache = None
+    # ---- cookies ----
+    def _ensure_cookies(self) -> int:
+        """Charge les cookies dans la session si la génération a changé."""
+        with self._cookie_lock:
+            if self._cookie_gen is None or self._cookie_gen != self.cookies.generation:
+                self._cookie_gen = self.cookies.apply(self.session)
+            return self._cookie_gen
+
+    def _refresh_cookie(self, seen_generation: int) -> None:
+        """Refresh unique partagé : les autres workers réutilisent le résultat."""
+        self.cookies.refresh(seen_generation)
+        self._ensure_cookies()
 
     # ---- headers ----
-    def build_headers(self, referer: str | None = None) -> Dict[str, str]:
-        headers = self.base_headers.copy()
-        headers["Cookie"] = self._load_cookie()
-        if referer:
-            headers["referer"] = referer
-        return headers
-
-    # ---- requête avec retry cookie + délai aléatoire ----
+    @staticmethod
+    def build_headers(referer: str | None = None) -> Dict[str, str] | None:
+        """Headers propres à la requête (le reste est porté par la session)."""
+        return {"referer": referer} if referer else None
+
+    def _count_retry(self, reason: str) -> None:
+        if self.metrics is not None:
+            self.metrics.retry(reason)
+
+    # ---- requête avec retry cookie + limiteur de débit ----
     def request(
         self,
         method: str,
@@ -110,37 +208,55 @@ class HttpClient:
         json_body: Dict[str, Any] | None = None,
         referer: str | None = None,
     ) -> requests.Response:
+        host = urlparse(url).netloc
         last_exc: Exception | None = None
 
         for attempt in range(1, self.max_retries + 1):
             try:
+                generation = self._ensure_cookies()
                 headers = self.build_headers(referer=referer)
+                self.rate_limiter.acquire(host)
+                sent = time.perf_counter()
                 resp = self.session.request(
                     method,
                     url,
                     headers=headers,
                     data=data,
                     json=json_body,
-                    timeout=30,
+                    timeout=self.timeout,
                 )
+                if self.metrics is not None:
+                    self.metrics.record(time.perf_counter() - sent, resp.status_code)
 
                 # Gestion 403 (cookie expiré)
                 if resp.status_code == 403:
                     if attempt < self.max_retries:
+                        self._count_retry("403")
                         print(f"⚠️ 403 détecté, refresh cookie (tentative {attempt})")
-                        self._refresh_cookie()
+                        self._refresh_cookie(generation)
                         continue
                     raise RuntimeError("403 après refresh cookie, abandon.")
 
-                # délai entre requêtes
-                time.sleep(random.uniform(self.min_delay, self.max_delay))
+                # Gestion 429 / 5xx (serveur sous pression) → ralentir
+                if resp.status_code == 429 or resp.status_code >= 500:
+                    retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                    self.rate_limiter.backoff(host, retry_after)
+                    last_exc = RuntimeError(f"HTTP {resp.status_code} sur {url}")
+                    if attempt < self.max_retries:
+                        self._count_retry(str(resp.status_code))
+                        print(f"⚠️ HTTP {resp.status_code}, ralentissement (tentative {attempt})")
+                        continue
+                    raise last_exc
+
+                self.rate_limiter.success(host)
                 return resp
 
             except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
                 last_exc = e
+                self.rate_limiter.backoff(host, self.retry_delay)
                 if attempt < self.max_retries:
+                    self._count_retry(type(e).__name__)
                     print(f"⚠️ Erreur réseau {e}, retry dans {self.retry_delay}s...")
-                    time.sleep(self.retry_delay)
                 else:
                     raise RuntimeError(f"Échec réseau après retries: {last_exc}") from e
 
@@ -181,6 +297,9 @@ class SeLogerScraper:
     SEARCH = BASE + "/serp-bff/search"
     DETAIL = BASE + "/cdp-bff/v1/classified/{}"
 
+    # tri utilisé par le mode incrémental (plus récentes en premier)
+    RECENT_ORDER = "DateDesc"
+
     # ⬇ headers repris de ta version d'origine (important pour éviter les 403)
     HEADERS = {
         'accept': '*/*',
@@ -209,15 +328,42 @@ class SeLogerScraper:
         city_name: str,
         location_id: str,
         cookie_path: str = "cookies/seloger_cookies.json",
+        max_workers: int = 4,
+        rate_limiter: RateLimiter | None = None,
+        cancel: CancelToken | None = None,
+        base_url: str | None = None,
+        metrics: RequestMetrics | None = None,
     ) -> None:
         self.cfg = ScraperConfig.from_city(city_name, location_id)
-        self.http = HttpClient(cookie_path, self.HEADERS)
+        self.max_workers = max_workers
+        self.cancel = cancel or CancelToken()
+        self.http = HttpClient(
+            cookie_path,
+            self.HEADERS,
+            rate_limiter=rate_limiter,
+            pool_size=max_workers,
+            metrics=metrics,
+        )
+
+        # base_url permet de viser un serveur local (benchmarks/fake_seloger.py)
+        self.base_url = (base_url or self.BASE).rstrip("/")
+        self.search_url = self.base_url + self.SEARCH[len(self.BASE):]
+        self.detail_url = self.base_url + self.DETAIL[len(self.BASE):]
 
         self.cfg.pages.mkdir(parents=True, exist_ok=True)
-        self.cfg.annonces.mkdir(parents=True, exist_ok=True)
+
+        # annonces brutes stockées en segments compressés (voir storage.py)
+        self.store = SegmentStore(self.cfg.base)
+
+        # index des annonces déjà sur disque : un seul listing au démarrage,
+        # mis à jour à chaque écriture (plus de stat par annonce)
+        self.known_ids = self.store.ids()
+
+        # curseur de reprise + annonces en échec
+        self.checkpoint = CrawlCheckpoint(self.cfg.base)
 
     # ---- payload recherche ----
-    def payload(self, page: int, size: int) -> Dict[str, Any]:
+    def payload(self, page: int, size: int, order: str = "Default") -> Dict[str, Any]:
         return {
             "criteria": {
                 "distributionTypes": ["Rent"],
@@ -225,23 +371,23 @@ class SeLogerScraper:
                 "projectTypes": ["Stock", "Flatsharing"],
                 "location": {"placeIds": [self.cfg.location_id]},
             },
-            "paging": {"page": page, "size": size, "order": "Default"},
+            "paging": {"page": page, "size": size, "order": order},
         }
 
     # ---- récupération d'une page de résultats ----
-    def search_page(self, page: int, size: int):
+    def search_page(self, page: int, size: int, order: str = "Default"):
         referer = (
             f"{self.BASE}/classified-search"
             f"?distributionTypes=Rent"
             f"&estateTypes=House,Apartment"
             f"&locations={self.cfg.location_id}"
-            f"&order=Default"
+            f"&order={order}"
         )
 
-        payload_json = json.dumps(self.payload(page, size))
+        payload_json = json.dumps(self.payload(page, size, order))
         resp = self.http.request(
             "POST",
-            self.SEARCH,
+            self.search_url,
             data=payload_json,
             referer=referer,
         )
@@ -250,61 +396,326 @@ class SeLogerScraper:
         return ads, data
 
     # ---- récupération d'une annonce ----
-    def scrape_ad(self, ad_id: str) -> None:
-        path = self.cfg.annonces / f"{ad_id}.json"
-        if path.exists():
-            return
+    def scrape_ad(self, ad_id: str, force: bool = False) -> bool:
+        """Récupère le détail d'une annonce ; False si déjà sur disque (sans requête)."""
+        if ad_id in self.known_ids and not force:
+            return False
 
-        if Path("stop_scraping.flag").exists():
-            raise KeyboardInterrupt("Stop requested")
+        self.cancel.raise_if_cancelled()
 
-        url = self.DETAIL.format(ad_id)
+        url = self.detail_url.format(ad_id)
         resp = self.http.request("GET", url)
-        save_json(resp.json(), path)
+        self.store.put(ad_id, resp.json())
+        self.known_ids.add(ad_id)
+        return True
+
+    # ---- récupération concurrente de plusieurs annonces ----
+    def _fetch_ad(self, ad_id: str, force: bool = False) -> bool:
+        """scrape_ad + mise à jour du checkpoint (un échec n'arrête pas la page)."""
+        try:
+            fetched = self.scrape_ad(ad_id, force)
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            print(f"❌ Échec annonce {ad_id}: {e}")
+            self.checkpoint.mark_failed(ad_id, str(e))
+            return False
+        self.checkpoint.mark_fetched(ad_id)
+        return fetched
+
+    def _scrape_ads(self, ad_ids: list[str], force: bool = False) -> int:
+        """Nombre de détails réellement récupérés (hors annonces déjà connues / en échec)."""
+        # détails récupérés en parallèle (max_workers requêtes en vol),
+        # le débit global reste borné par le RateLimiter partagé
+        fetched = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self._fetch_ad, ad_id, force) for ad_id in ad_ids]
+            try:
+                for fut in as_completed(futures):
+                    fetched += fut.result()
+            except BaseException:
+                for fut in futures:
+                    fut.cancel()
+                raise
+        return fetched
+
+    def _within_budget(self, ad_ids: list[str], limit: int | None) -> tuple[list[str], bool]:
+        """
+        Coupe la liste pour ne pas dépasser `limit` annonces à récupérer :
+        les annonces déjà sur disque ne consomment pas le budget.
+        Retourne (ids gardés, liste tronquée ?).
+        """
+        if limit is None:
+            return ad_ids, False
+        to_fetch = 0
+        for i, ad_id in enumerate(ad_ids):
+            if ad_id not in self.known_ids:
+                if to_fetch == limit:
+                    return ad_ids[:i], True
+                to_fetch += 1
+        return ad_ids, False
+
+    def retry_failed(self) -> int:
+        """Retente les annonces en échec lors des runs précédents."""
+        failed = list(self.checkpoint.failed)
+        if failed:
+            print(f"🔁 {self.cfg.city} : {len(failed)} annonces en échec retentées")
+            self._scrape_ads(failed, force=True)
+        return len(failed)
 
     # ---- récupération d'une page complète ----
-    def scrape_page(self, page: int, size: int) -> int:
-        ads, data = self.search_page(page, size)
-        if not ads:
-            return 0
+    def scrape_page(self, page: int, size: int, limit: int | None = None) -> tuple[int, int]:
+        """
+        Récupère une page de résultats et le détail de ses annonces.
+        `limit` borne le nombre de détails récupérés (budget par ville, les
+        annonces déjà sur disque ne comptent pas) ; une page tronquée n'est
+        pas sauvegardée pour être reprise plus tard.
+        Si la recherche de cette page a déjà été faite lors d'un run
+        interrompu, on reprend ses annonces depuis le checkpoint.
+        Retourne (annonces de la page traitées, détails récupérés).
+        """
+        ad_ids = self.checkpoint.pending(page)
+        truncated = False
+        data = None
+
+        if ad_ids is None:
+            ads, data = self.search_page(page, size)
+            if not ads:
+                return 0, 0
+
+            # page complète dans le checkpoint : une page tronquée reprend
+            # au prochain run là où le budget l'a arrêtée
+            ad_ids = [str(ad["id"]) for ad in ads]
+            self.checkpoint.start_page(page, ad_ids)
+            ad_ids, truncated = self._within_budget(ad_ids, limit)
+        else:
+            print(f"↩️ {self.cfg.city} : reprise page {page} ({len(ad_ids)} annonces restantes)")
+            ad_ids, truncated = self._within_budget(ad_ids, limit)
+
+        fetched = self._scrape_ads(ad_ids)
+
+        if data is not None and not truncated:
+            save_json(data, self.cfg.pages / f"page_{page}.json")
+        self.checkpoint.finish_page(page, complete=not truncated)
+        return len(ad_ids), fetched
+
+    # ---- mode incrémental (annonces les plus récentes d'abord) ----
+    def stored_update_date(self, ad_id: str) -> datetime | None:
+        """
+        Date de mise à jour de la copie locale d'une annonce (None si absente
+        ou sans updateDate : tester known_ids pour savoir si elle est connue).
+        """
+        if ad_id not in self.known_ids:
+            return None
+        try:
+            return parse_date(self.store.update_date(ad_id))
+        except (OSError, ValueError):
+            return None
 
-        for ad in ads:
-            self.scrape_ad(str(ad["id"]))
+    def scrape_page_delta(
+        self,
+        page: int,
+        size: int,
+        known_streak: int,
+        stop_after: int,
+        limit: int | None = None,
+    ) -> tuple[int, int, int]:
+        """
+        Parcourt une page triée par date décroissante.
+        - annonce inconnue → détail récupéré
+        - annonce connue mais updateDate plus récente (ou copie locale sans
+          updateDate) → détail re-récupéré (force=True)
+        - annonce connue et à jour → compte dans la série d'annonces connues
+        S'arrête dès que `stop_after` annonces connues consécutives sont vues.
+        `limit` borne le nombre de détails récupérés (budget par ville).
+        Retourne (annonces vues, détails récupérés, série en cours).
+        Les pages ne sont pas sauvegardées : leur numérotation glisse à
+        chaque nouvelle annonce.
+        """
+        ads, _ = self.search_page(page, size, order=self.RECENT_ORDER)
+        new_ids, updated_ids = [], []
+        seen = 0
 
-        save_json(data, self.cfg.pages / f"page_{page}.json")
-        return len(ads)
+        for ad in ads:
+            seen += 1
+            ad_id = str(ad["id"])
+            if ad_id not in self.known_ids:
+                new_ids.append(ad_id)
+                known_streak = 0
+                continue
+
+            stored = self.stored_update_date(ad_id)
+            remote = parse_date(
+                (ad.get("metadata") or {}).get("updateDate") or ad.get("updateDate")
+            )
+            # copie locale sans date mais date distante connue : on la re-récupère
+            # (sinon, rien à comparer → annonce connue)
+            if remote is not None and (stored is None or remote > stored):
+                updated_ids.append(ad_id)
+                known_streak = 0
+                continue
 
+            known_streak += 1
+            if known_streak >= stop_after:
+                break
 
-# -------------------------------------------------------------------------
-# SCRAPER MULTI-VILLES EN ALTERNANCE
-# -------------------------------------------------------------------------
+        if limit is not None:
+            new_ids = new_ids[:limit]
+            updated_ids = updated_ids[:max(0, limit - len(new_ids))]
 
-def run_scraping(cities: Dict[str, str], size: int = 30, max_page: int = 999):
-    scrapers = {name: SeLogerScraper(name, loc) for name, loc in cities.items()}
-    stats = {name: {"pages": 0, "ads": 0, "done": False} for name in cities}
-    alive = set(cities.keys())
+        fetched = self._scrape_ads(new_ids)
+        fetched += self._scrape_ads(updated_ids, force=True)
+        return seen, fetched, known_streak
 
-    # page de départ par ville
-    current_page = {city: get_last_scraped_page(city) + 1 for city in cities}
 
-    while alive:
-        for city in list(alive):
-            s = scrapers[city]
-            page = current_page[city]
+# -------------------------------------------------------------------------
+# SCRAPER MULTI-VILLES EN PARALLÈLE
+# -------------------------------------------------------------------------
 
+def _crawl_city(
+    scraper: SeLogerScraper,
+    stats: Dict[str, Any],
+    size: int,
+    max_page: int,
+    max_ads: int | None,
+    incremental: bool = False,
+    stop_after_known: int = 30,
+) -> None:
+    """
+    Parcourt les pages d'une ville jusqu'à page vide, max_page ou max_ads.
+    En mode incrémental, repart de la page 1 (tri par date) et s'arrête
+    après `stop_after_known` annonces déjà connues d'affilée.
+    """
+    city = scraper.cfg.city
+    if incremental:
+        page = 1
+    else:
+        # reprise exacte depuis le checkpoint (sinon ancien format pages/)
+        page = scraper.checkpoint.page or get_last_scraped_page(city) + 1
+    known_streak = 0
+    start = time.monotonic()
+
+    try:
+        scraper.retry_failed()
+        while True:
+            if page > max_page:
+                print(f"Fin du scraping pour {city} (max_page={max_page} atteint)")
+                break
+
+            remaining = None if max_ads is None else max_ads - stats["ads"]
+            if remaining is not None and remaining <= 0:
+                print(f"Fin du scraping pour {city} (budget de {max_ads} annonces atteint)")
+                break
+
+            scraper.cancel.raise_if_cancelled()
             print(f"\n=== {city} → page {page} ===")
 
-            n = s.scrape_page(page, size)
-            stats[city]["pages"] = page
-            stats[city]["ads"] += n
+            if incremental:
+                n, fetched, known_streak = scraper.scrape_page_delta(
+                    page, size, known_streak, stop_after_known, limit=remaining
+                )
+                stats["ads"] += fetched
+            else:
+                n, fetched = scraper.scrape_page(page, size, limit=remaining)
+                stats["ads"] += fetched
+            stats["pages"] = page
 
             if n == 0:
                 print(f"Fin du scraping pour {city} (page vide)")
-                alive.remove(city)
-            else:
-                current_page[city] += 1
+                break
+            if incremental and known_streak >= stop_after_known:
+                print(f"Fin du scraping pour {city} ({known_streak} annonces déjà connues)")
+                break
+            page += 1
+
+        stats["done"] = True
+
+    except KeyboardInterrupt:
+        print(f"🛑 Arrêt demandé pour {city}")
+        stats["cancelled"] = True
+        raise
+    except Exception as e:
+        print(f"❌ Erreur scraping {city}: {e}")
+        stats["error"] = str(e)
+        raise
+    finally:
+        scraper.checkpoint.flush()
+        stats["elapsed"] = round(time.monotonic() - start, 2)
+
+
+def run_scraping(
+    cities: Dict[str, str],
+    size: int = 30,
+    max_page: int = 999,
+    max_ads: int | None = None,
+    max_workers: int = 4,
+    incremental: bool = False,
+    stop_after_known: int = 30,
+    cancel: CancelToken | None = None,
+    rate_limiter: RateLimiter | None = None,
+    base_url: str | None = None,
+    metrics: RequestMetrics | None = None,
+):
+    """
+    Lance un worker (thread) par ville : une ville lente ne bloque plus les
+    autres. Toutes les requêtes passent par le même DEFAULT_RATE_LIMITER,
+    le débit global reste donc borné quel que soit le nombre de villes.
+
+    incremental=True : rafraîchissement quotidien, on repart de la page 1
+    triée par date et on s'arrête dès que `stop_after_known` annonces
+    consécutives sont déjà sur disque (stats["ads"] = détails récupérés).
+
+    `cancel` permet d'arrêter tous les workers depuis l'appelant
+    (cancel.cancel()) ; le fichier STOP_FLAG reste pris en compte.
+    Une fois toutes les villes terminées, un arrêt (KeyboardInterrupt) ou
+    l'erreur d'une ville est relevé(e) ici ; stats reste renseigné.
+
+    Retourne (stats, elapsed) : stats par ville ({pages, ads, done,
+    elapsed, ...}) et durée totale du scraping en secondes.
+
+    rate_limiter / base_url / metrics servent aux benchmarks contre le
+    serveur local (voir benchmarks/bench_scraping.py).
+    """
+    cancel = cancel or CancelToken()
+    scrapers = {
+        name: SeLogerScraper(
+            name,
+            loc,
+            max_workers=max_workers,
+            rate_limiter=rate_limiter,
+            cancel=cancel,
+            base_url=base_url,
+            metrics=metrics,
+        )
+        for name, loc in cities.items()
+    }
+    stats = {
+        name: {"pages": 0, "ads": 0, "done": False, "elapsed": 0.0}
+        for name in cities
+    }
 
-    return stats
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(cities) or 1) as pool:
+        futures = [
+            pool.submit(
+                _crawl_city,
+                scraper,
+                stats[name],
+                size,
+                max_page,
+                max_ads,
+                incremental,
+                stop_after_known,
+            )
+            for name, scraper in scrapers.items()
+        ]
+
+    elapsed = round(time.monotonic() - start, 2)
+    print(f"⏱️ Scraping terminé en {elapsed:.1f}s")
+    # les autres villes ont fini : on propage l'arrêt / la première erreur à l'appelant
+    for fut in futures:
+        fut.result()
+    return stats, elapsed
 
 
 # -------------------------------------------------------------------------
@@ -0,0 +1,116 @@
+"""
+Agrégation spatiale des annonces pour les cartes pydeck.
+
+Au nettoyage, les biens (un par dup_cluster) sont regroupés dans une grille
+carrée en mètres, pour plusieurs tailles de maille selon le zoom de la
+carte (ZOOM_CELLS). Chaque maille porte son effectif et la médiane du prix
+au m² ; le tout est écrit dans <sortie>.grid.parquet (quelques milliers de
+lignes au plus) et la page n'envoie plus chaque annonce au navigateur.
+
+Projection équirectangulaire locale (cos de la latitude médiane) : à
+l'échelle d'une ville l'écart avec les mètres de deck.gl est négligeable.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from summary import one_per_property
+
+
+# zoom pydeck → taille de maille (m)
+ZOOM_CELLS = {10: 1000, 11: 500, 12: 250, 13: 125, 14: 60}
+M_PER_DEG_LAT = 110_540.0
+M_PER_DEG_LON = 111_320.0
+
+GRID_SCHEMA = pa.schema([
+    ("cell_m", pa.int32()),
+    ("lon", pa.float64()),       # centre de la maille
+    ("lat", pa.float64()),
+    ("lon0", pa.float64()),      # coin sud-ouest (GridCellLayer)
+    ("lat0", pa.float64()),
+    ("count", pa.int32()),
+    ("median_price_m2", pa.float64()),
+])
+
+
+def empty_grid() -> pd.DataFrame:
+    """Grille sans maille, colonnes typées comme GRID_SCHEMA."""
+    return GRID_SCHEMA.empty_table().to_pandas()
+
+
+def grid_aggregate(df: pd.DataFrame, cell_m: float, lat_ref: float | None = None) -> pd.DataFrame:
+    """Effectif et médiane du prix au m² par maille de `cell_m` mètres (un seul groupby)."""
+    pts = df.loc[df["lon"].notna() & df["lat"].notna() & df["price_m2"].notna(), ["lon", "lat", "price_m2"]]
+    if pts.empty:
+        return empty_grid()
+    if lat_ref is None:
+        lat_ref = float(pts["lat"].median())
+
+    deg_lon = cell_m / (M_PER_DEG_LON * np.cos(np.radians(lat_ref)))
+    deg_lat = cell_m / M_PER_DEG_LAT
+    ix = np.floor(pts["lon"].to_numpy() / deg_lon).astype(np.int64)
+    iy = np.floor(pts["lat"].to_numpy() / deg_lat).astype(np.int64)
+
+    grouped = pts["price_m2"].groupby([ix, iy])
+    cells = pd.DataFrame({"count": grouped.size(), "median_price_m2": grouped.median()})
+    gx = cells.index.get_level_values(0).to_numpy()
+    gy = cells.index.get_level_values(1).to_numpy()
+    return pd.DataFrame({
+        "cell_m": int(cell_m),
+        "lon": (gx + 0.5) * deg_lon,
+        "lat": (gy + 0.5) * deg_lat,
+        "lon0": gx * deg_lon,
+        "lat0": gy * deg_lat,
+        "count": cells["count"].to_numpy(),
+        "median_price_m2": cells["median_price_m2"].round(2).to_numpy(),
+    })
+
+
+def build_grid(df: pd.DataFrame, cells=tuple(ZOOM_CELLS.values())) -> pd.DataFrame:
+    """Toutes les mailles de ZOOM_CELLS, sur un bien par dup_cluster."""
+    props = one_per_property(df)
+    if not {"lon", "lat", "price_m2"} <= set(props.columns):
+        return empty_grid()
+    lat_ref = props["lat"].median()
+    lat_ref = float(lat_ref) if pd.notna(lat_ref) else 0.0
+    return pd.concat([grid_aggregate(props, c, lat_ref) for c in cells], ignore_index=True)
+
+
+def save_grid(grid: pd.DataFrame, path: Path) -> None:
+    table = pa.Table.from_pandas(grid, schema=GRID_SCHEMA, preserve_index=False)
+    tmp = Path(path).with_name(f".{Path(path).name}.tmp")
+    pq.write_table(table, tmp)
+    tmp.replace(path)
+
+
+def load_grid(path: Path) -> pd.DataFrame | None:
+    try:
+        return pq.read_table(path).to_pandas()
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def cell_for_zoom(zoom: int) -> int:
+    """Maille précalculée la plus proche du zoom demandé."""
+    zoom = min(max(zoom, min(ZOOM_CELLS)), max(ZOOM_CELLS))
+    return ZOOM_CELLS[zoom]
+
+
+# -------------------------------------------------------------------------
+# COULEURS
+# -------------------------------------------------------------------------
+
+def price_colors(values, vmin: float, vmax: float) -> np.ndarray:
+    """Couleurs RGBA (uint8, n×4) du bleu (bon marché) au rouge, vectorisé."""
+    t = np.clip((np.asarray(values, dtype=float) - vmin) / (vmax - vmin + 1e-9), 0, 1)
+    t = np.nan_to_num(t, nan=0.5)
+    rgba = np.empty((len(t), 4), dtype=np.uint8)
+    rgba[:, 0] = 255 * t
+    rgba[:, 1] = 30 * (1 - t)
+    rgba[:, 2] = 255 * (1 - t)
+    rgba[:, 3] = 255
+    return rgba
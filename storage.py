@@ -0,0 +1,422 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, NamedTuple
+
+from filelock import FileLock
+
+
+# -------------------------------------------------------------------------
+# ÉCRITURE ATOMIQUE
+# -------------------------------------------------------------------------
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """
+    Écrit dans un fichier temporaire du même dossier puis le renomme :
+    en cas de crash, le fichier cible est soit l'ancien, soit le nouveau,
+    jamais un JSON à moitié écrit.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+# -------------------------------------------------------------------------
+# RÉFÉRENCE VERS UNE ANNONCE STOCKÉE
+# -------------------------------------------------------------------------
+
+class SegmentRef(NamedTuple):
+    """Position d'une annonce dans un segment (picklable, sans état ouvert)."""
+    path: str
+    offset: int
+    length: int
+    ad_id: str
+
+
+def read_segment_record(ref: SegmentRef, loads=json.loads) -> Dict[str, Any]:
+    """Lit une annonce : seek + lecture d'un seul membre gzip."""
+    with open(ref.path, "rb") as f:
+        f.seek(ref.offset)
+        blob = f.read(ref.length)
+    return loads(gzip.decompress(blob))
+
+
+# -------------------------------------------------------------------------
+# STOCKAGE EN SEGMENTS APPEND-ONLY
+# -------------------------------------------------------------------------
+
+class SegmentStore:
+    """
+    Stockage des annonces brutes d'une ville :
+
+        jsons/<ville>/segments/seg_00001.jsonl.gz
+        jsons/<ville>/segments/index.jsonl
+
+    Chaque annonce est ajoutée en fin de segment sous forme de ligne JSON
+    compacte compressée comme un membre gzip indépendant : le segment reste
+    lisible avec `gzip.open` et une annonce se relit seule grâce à l'index
+    id → (segment, offset, longueur). Un segment est clos dès qu'il dépasse
+    `segment_size` octets. Une annonce ré-écrite est ajoutée à nouveau,
+    la dernière entrée de l'index fait foi.
+
+    Les anciens fichiers annonces/<id>.json restent lisibles tant qu'ils
+    n'ont pas été migrés (voir `migrate`).
+    """
+
+    INDEX = "index.jsonl"
+
+    def __init__(self, base: Path, segment_size: int = 64 * 1024 * 1024) -> None:
+        self.base = Path(base)
+        self.dir = self.base / "segments"
+        self.legacy_dir = self.base / "annonces"
+        self.index_path = self.dir / self.INDEX
+        self.segment_size = segment_size
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._index_pos = 0
+        self._legacy: set[str] | None = None
+
+        self._load_index()
+
+    # ---- index ----
+    def _load_index(self) -> None:
+        """Lit les lignes d'index ajoutées depuis la dernière lecture."""
+        if not self.index_path.exists():
+            return
+        if self.index_path.stat().st_size < self._index_pos:
+            # index recréé (dossier supprimé puis re-scrapé) : relecture complète
+            self._index, self._index_pos = {}, 0
+        with self.index_path.open("rb") as f:
+            f.seek(self._index_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # ligne en cours d'écriture
+                self._index_pos += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._index[entry["id"]] = entry
+
+    def _repair_index(self) -> None:
+        """
+        Supprime une ligne d'index incomplète laissée par un crash (à appeler
+        sous verrou). Un membre gzip orphelin en fin de segment est sans
+        danger : il n'est référencé par aucune ligne d'index.
+        """
+        if self.index_path.exists() and self.index_path.stat().st_size > self._index_pos:
+            with self.index_path.open("r+b") as f:
+                f.truncate(self._index_pos)
+
+    def _legacy_ids(self) -> set[str]:
+        if self._legacy is None:
+            if self.legacy_dir.exists():
+                self._legacy = {p.stem for p in self.legacy_dir.glob("*.json")}
+            else:
+                self._legacy = set()
+        return self._legacy
+
+    def ids(self) -> set[str]:
+        """Identifiants de toutes les annonces connues (segments + ancien format)."""
+        with self._lock:
+            self._load_index()
+            return set(self._index) | self._legacy_ids()
+
+    def __contains__(self, ad_id: str) -> bool:
+        return ad_id in self._index or ad_id in self._legacy_ids()
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def count(self) -> int:
+        """
+        Nombre d'annonces sans construire l'ensemble des ids : sur un store
+        gardé ouvert, seules les lignes d'index ajoutées depuis l'appel
+        précédent sont lues (comptage périodique de la page Scraping).
+        """
+        with self._lock:
+            self._load_index()
+            legacy = self._legacy_ids()
+            if not legacy:
+                return len(self._index)
+            return len(self._index) + len(legacy - self._index.keys())
+
+    def update_date(self, ad_id: str) -> str | None:
+        """metadata.updateDate de la version stockée, sans relire l'annonce."""
+        entry = self._index.get(ad_id)
+        if entry is not None:
+            return entry.get("upd")
+        data = self.get(ad_id)
+        return (data.get("metadata") or {}).get("updateDate") if data else None
+
+    def mtime(self) -> float:
+        """Date de dernière écriture (index + dossier legacy), 0 si vide."""
+        times = [p.stat().st_mtime for p in (self.index_path, self.legacy_dir) if p.exists()]
+        return max(times, default=0.0)
+
+    # ---- écriture ----
+    def _current_segment(self) -> Path:
+        segments = sorted(self.dir.glob("seg_*.jsonl.gz"))
+        if segments and segments[-1].stat().st_size < self.segment_size:
+            return segments[-1]
+        return self.dir / f"seg_{len(segments) + 1:05d}.jsonl.gz"
+
+    def put(self, ad_id: str, data: Dict[str, Any]) -> None:
+        line = json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n"
+        blob = gzip.compress(line.encode("utf-8"))
+        entry = {
+            "id": ad_id,
+            "upd": (data.get("metadata") or {}).get("updateDate"),
+        }
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        # verrou thread + verrou fichier (plusieurs process peuvent écrire)
+        with self._lock, FileLock(str(self.dir / ".lock")):
+            self._load_index()
+            self._repair_index()
+            segment = self._current_segment()
+            with segment.open("ab") as f:
+                offset = f.tell()
+                f.write(blob)
+            entry.update(seg=segment.name, off=offset, len=len(blob))
+            with self.index_path.open("ab") as f:
+                f.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+            self._load_index()
+
+    # ---- lecture ----
+    def ref(self, ad_id: str) -> SegmentRef | Path | None:
+        entry = self._index.get(ad_id)
+        if entry is not None:
+            return SegmentRef(str(self.dir / entry["seg"]), entry["off"], entry["len"], ad_id)
+        if ad_id in self._legacy_ids():
+            return self.legacy_dir / f"{ad_id}.json"
+        return None
+
+    def refs(self) -> list[SegmentRef | Path]:
+        """Une référence par annonce (dernière version), triée par position disque."""
+        with self._lock:
+            self._load_index()
+            entries = sorted(self._index.values(), key=lambda e: (e["seg"], e["off"]))
+        refs: list[SegmentRef | Path] = [
+            SegmentRef(str(self.dir / e["seg"]), e["off"], e["len"], e["id"]) for e in entries
+        ]
+        refs.extend(
+            self.legacy_dir / f"{ad_id}.json"
+            for ad_id in sorted(self._legacy_ids() - self._index.keys())
+        )
+        return refs
+
+    def get(self, ad_id: str) -> Dict[str, Any] | None:
+        ref = self.ref(ad_id)
+        if ref is None:
+            with self._lock:
+                self._load_index()
+            ref = self.ref(ad_id)
+        if ref is None:
+            return None
+        if isinstance(ref, SegmentRef):
+            return read_segment_record(ref)
+        return json.loads(ref.read_text(encoding="utf-8"))
+
+    def __iter__(self) -> Iterator[tuple[str, Dict[str, Any]]]:
+        for ref in self.refs():
+            if isinstance(ref, SegmentRef):
+                yield ref.ad_id, read_segment_record(ref)
+            else:
+                yield ref.stem, json.loads(ref.read_text(encoding="utf-8"))
+
+    # ---- migration ----
+    def migrate(self, delete: bool = False) -> int:
+        """Copie les fichiers annonces/<id>.json dans les segments."""
+        legacy = sorted(self._legacy_ids() - self._index.keys())
+        for ad_id in legacy:
+            path = self.legacy_dir / f"{ad_id}.json"
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"❌ Erreur JSON {path}: {e}")
+                continue
+            self.put(ad_id, data)
+
+        if delete:
+            for ad_id in self._legacy_ids() & self._index.keys():
+                (self.legacy_dir / f"{ad_id}.json").unlink(missing_ok=True)
+            self._legacy = None
+        return len(legacy)
+
+
+# -------------------------------------------------------------------------
+# CHECKPOINT DE CRAWL PAR VILLE
+# -------------------------------------------------------------------------
+
+class CrawlCheckpoint:
+    """
+    Manifeste de reprise jsons/<ville>/checkpoint.json, réécrit de façon
+    atomique :
+    - page       : curseur (page en cours ou prochaine page à chercher)
+    - page_ids   : annonces de la page en cours (None si pas encore cherchée)
+    - fetched    : annonces de la page en cours déjà récupérées
+    - failed     : annonces en échec {id: erreur}, retentées au prochain run
+    - last_success : horodatage ISO du dernier détail récupéré
+    La reprise repart exactement de là, sans refaire la recherche.
+
+    Changement de page et échec : écriture immédiate. Annonce récupérée :
+    écriture groupée (toutes les SAVE_EVERY annonces ou SAVE_INTERVAL
+    secondes), `flush` en fin de crawl. Après un crash, les quelques
+    annonces non notées sont déjà sur disque et ne sont pas re-téléchargées
+    (known_ids).
+    """
+
+    FILE = "checkpoint.json"
+    SAVE_EVERY = 50
+    SAVE_INTERVAL = 1.0
+
+    def __init__(self, base: Path) -> None:
+        self.path = Path(base) / self.FILE
+        self._lock = threading.Lock()
+        self.page: int | None = None
+        self.page_ids: list[str] | None = None
+        self.fetched: set[str] = set()
+        self.failed: Dict[str, str] = {}
+        self.last_success: str | None = None
+        self._unsaved = 0
+        self._saved_at = 0.0
+
+        if self.path.exists():
+            try:
+                state = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Checkpoint illisible {self.path}: {e}")
+                state = {}
+            self.page = state.get("page")
+            self.page_ids = state.get("page_ids")
+            self.fetched = set(state.get("fetched", []))
+            self.failed = dict(state.get("failed", {}))
+            self.last_success = state.get("last_success")
+
+    def _save(self) -> None:
+        state = {
+            "page": self.page,
+            "page_ids": self.page_ids,
+            "fetched": sorted(self.fetched),
+            "failed": self.failed,
+            "last_success": self.last_success,
+        }
+        atomic_write_text(self.path, json.dumps(state, indent=2, ensure_ascii=False))
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    def flush(self) -> None:
+        """Écrit les annonces récupérées pas encore sauvegardées."""
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+    def pending(self, page: int) -> list[str] | None:
+        """Annonces restantes de `page` si sa recherche a déjà été faite."""
+        with self._lock:
+            if self.page != page or self.page_ids is None:
+                return None
+            return [i for i in self.page_ids if i not in self.fetched]
+
+    def start_page(self, page: int, ad_ids: list[str]) -> None:
+        with self._lock:
+            self.page = page
+            self.page_ids = list(ad_ids)
+            self.fetched = set()
+            self._save()
+
+    def finish_page(self, page: int, complete: bool = True) -> None:
+        """
+        Page terminée : le curseur avance. Page tronquée (budget atteint) :
+        le curseur reste et page_ids/fetched sont gardés pour reprendre ses
+        annonces restantes au prochain run.
+        """
+        with self._lock:
+            if complete:
+                self.page = page + 1
+                self.page_ids = None
+                self.fetched = set()
+            else:
+                self.page = page
+            self._save()
+
+    def mark_fetched(self, ad_id: str) -> None:
+        with self._lock:
+            if self.page_ids is not None:
+                self.fetched.add(ad_id)
+            self.failed.pop(ad_id, None)
+            self.last_success = datetime.now(timezone.utc).isoformat()
+            self._unsaved += 1
+            if (self._unsaved >= self.SAVE_EVERY
+                    or time.monotonic() - self._saved_at >= self.SAVE_INTERVAL):
+                self._save()
+
+    def mark_failed(self, ad_id: str, error: str) -> None:
+        with self._lock:
+            self.failed[ad_id] = error
+            self._save()
+
+
+def open_city_stores(city_name: str | None, root: Path = Path("jsons")) -> list[SegmentStore]:
+    """Stores d'une ville, ou de toutes les villes si city_name est None."""
+    if city_name:
+        return [SegmentStore(root / city_name.lower())]
+    if not root.exists():
+        return []
+    return [SegmentStore(d) for d in sorted(root.iterdir()) if d.is_dir()]
+
+
+def data_version(city_name: str, root: Path = Path("jsons")) -> tuple:
+    """
+    Version des données brutes d'une ville sans ouvrir le store ni lire
+    l'index : (mtime_ns, taille) de l'index des segments et mtime_ns du
+    dossier de l'ancien format. Change à chaque annonce écrite.
+    """
+    base = root / city_name.lower()
+    version = []
+    for path in (base / "segments" / SegmentStore.INDEX, base / "annonces"):
+        try:
+            st = path.stat()
+            version += [st.st_mtime_ns, st.st_size]
+        except FileNotFoundError:
+            version += [0, 0]
+    return tuple(version)
+
+
+# ----------------------------------------------------------------------
+# MIGRATION DE L'ANCIEN FORMAT (un JSON par annonce)
+# ----------------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Migre jsons/<ville>/annonces/*.json vers les segments compressés."
+    )
+    parser.add_argument("cities", nargs="*", help="villes à migrer (toutes par défaut)")
+    parser.add_argument("--delete", action="store_true", help="supprime les fichiers migrés")
+    args = parser.parse_args()
+
+    stores = (
+        [s for c in args.cities for s in open_city_stores(c)]
+        if args.cities
+        else open_city_stores(None)
+    )
+    for store in stores:
+        n = store.migrate(delete=args.delete)
+        print(f"📦 {store.base.name} : {n} annonces migrées ({len(store)} au total)")
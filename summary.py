@@ -0,0 +1,96 @@
+"""
+Résumé matérialisé d'une ville, calculé une fois au nettoyage et écrit à
+côté de la sortie (<sortie>.summary.json) : la page Visualisation affiche
+indicateurs, tendances et histogramme sans relire les annonces.
+
+Contenu (un bien par dup_cluster, comme les graphiques) :
+- stats globales du prix au m² et de la surface (n, moyenne, quantiles)
+- médianes et quartiles du prix au m² par jour, semaine (lundi) et mois
+  (timeseries.py)
+- histogramme des surfaces (pas de 5 m², dernière classe = 200 m² et plus)
+- centre géographique des annonces
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from storage import atomic_write_text
+from timeseries import FREQS, price_series, to_dict
+
+
+SUMMARY_VERSION = 3
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# classes de 5 m² ; la dernière, [200, 205], reçoit toutes les surfaces ≥ 200
+SURFACE_EDGES = np.arange(0, 210, 5)
+# colonnes nécessaires pour recalculer un résumé depuis une sortie existante
+SUMMARY_COLUMNS = ["price_m2", "livingSpace", "creation_date", "update_date", "lat", "lon", "dup_cluster"]
+
+
+def one_per_property(df: pd.DataFrame) -> pd.DataFrame:
+    """Un bien publié plusieurs fois (agences, nouvel id) ne compte qu'une fois."""
+    if "dup_cluster" not in df.columns:
+        return df
+    return df.drop_duplicates(subset="dup_cluster")
+
+
+def _float(x, digits: int = 2) -> float | None:
+    return None if pd.isna(x) else round(float(x), digits)
+
+
+def _stats(s: pd.Series) -> Dict[str, Any]:
+    s = s.dropna()
+    q = s.quantile(QUANTILES) if len(s) else pd.Series(np.nan, index=QUANTILES)
+    return {
+        "count": int(len(s)),
+        "mean": _float(s.mean()),
+        "min": _float(s.min()),
+        "max": _float(s.max()),
+        **{f"q{int(k * 100)}": _float(v) for k, v in q.items()},
+    }
+
+
+def summarize(df: pd.DataFrame, city: str | None = None) -> Dict[str, Any]:
+    """Résumé JSON-sérialisable d'une sortie nettoyée."""
+    props = one_per_property(df)
+    price = props["price_m2"] if "price_m2" in props.columns else pd.Series(dtype=float)
+    surface = props["livingSpace"] if "livingSpace" in props.columns else pd.Series(dtype=float)
+
+    summary: Dict[str, Any] = {
+        "version": SUMMARY_VERSION,
+        "city": city,
+        "rows": int(len(df)),
+        "properties": int(len(props)),
+        "price_m2": _stats(price),
+        "surface": _stats(surface),
+    }
+
+    if {"update_date", "creation_date"} & set(props.columns) and "price_m2" in props.columns:
+        for freq, key in FREQS.items():
+            summary[key] = to_dict(price_series(props, freq, by=None))
+
+    counts, _ = np.histogram(np.clip(surface.dropna(), 0, SURFACE_EDGES[-2]), bins=SURFACE_EDGES)
+    summary["surface_hist"] = {"edges": SURFACE_EDGES.tolist(), "counts": counts.tolist()}
+
+    if {"lat", "lon"} <= set(props.columns):
+        summary["geo"] = {
+            "lat_mean": _float(props["lat"].mean(), 6),
+            "lon_mean": _float(props["lon"].mean(), 6),
+        }
+    return summary
+
+
+def save_summary(summary: Dict[str, Any], path: Path) -> None:
+    atomic_write_text(Path(path), json.dumps(summary, ensure_ascii=False))
+
+
+def load_summary(path: Path) -> Dict[str, Any] | None:
+    """Résumé écrit au nettoyage, None s'il est absent ou d'un ancien format."""
+    try:
+        summary = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return summary if summary.get("version") == SUMMARY_VERSION else None
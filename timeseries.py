@@ -0,0 +1,98 @@
+"""
+Séries temporelles du prix au m², sans boucle Python par annonce.
+
+- bucketize : date → début de période (jour, semaine au lundi, mois),
+  entièrement vectorisé (pas de to_period().apply)
+- price_series : effectif, médiane et quartiles par (ville, période) en un
+  seul groupby, pour N villes à la fois (colonne `by`) ou une seule
+- smooth : médiane glissante par ville (groupby().rolling, pas de lambda)
+
+Utilisé au nettoyage par summary.py (séries écrites dans le résumé) et
+par la page Visualisation via viz_cache.price_trends.
+"""
+
+import pandas as pd
+
+
+FREQS = {"D": "daily", "W": "weekly", "M": "monthly"}   # clé du résumé par granularité
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def best_dates(df: pd.DataFrame) -> pd.Series:
+    """Meilleure colonne date (update_date sinon creation_date), en UTC naïf."""
+    col = "update_date" if "update_date" in df.columns else "creation_date"
+    dates = df[col]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors="coerce", utc=True)
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert(None)
+    return dates
+
+
+def bucketize(dates: pd.Series, freq: str = "W") -> pd.Series:
+    """Début de la période (D : jour, W : lundi, M : 1er du mois) de chaque date."""
+    if freq not in FREQS:
+        raise ValueError(f"granularité inconnue : {freq} (attendu : {', '.join(FREQS)})")
+    days = dates.dt.normalize()
+    if freq == "D":
+        return days
+    if freq == "W":
+        return days - pd.to_timedelta(days.dt.dayofweek, unit="D")
+    months = dates.to_numpy().astype("datetime64[M]").astype("datetime64[ns]")
+    return pd.Series(months, index=dates.index, name=dates.name)
+
+
+def _quantile_name(q: float) -> str:
+    return "median" if q == 0.5 else f"q{int(round(q * 100))}"
+
+
+def price_series(
+    df: pd.DataFrame,
+    freq: str = "W",
+    by: str | None = "city",
+    value: str = "price_m2",
+    quantiles=QUANTILES,
+) -> pd.DataFrame:
+    """
+    Série longue [by,] period, count, median, q25, q75… triée par (by, period).
+    Sans colonne `by` dans df (ou by=None), une seule série.
+    """
+    dates = best_dates(df)
+    valid = dates.notna() & df[value].notna()
+    keys = [bucketize(dates[valid], freq).rename("period")]
+    if by is not None and by in df.columns:
+        keys.insert(0, df.loc[valid, by])
+
+    grouped = df.loc[valid, value].groupby(keys, sort=True, observed=True)
+    out = grouped.quantile(list(quantiles)).unstack()
+    out.columns = [_quantile_name(q) for q in out.columns]
+    out.insert(0, "count", grouped.size())
+    return out.reset_index()
+
+
+def smooth(series: pd.DataFrame, window: int = 3, column: str = "median", by: str | None = "city") -> pd.Series:
+    """Médiane glissante centrée de `column` sur `window` périodes, ville par ville."""
+    ordered = series.sort_values([by, "period"] if by else "period")
+    rolling = (ordered.groupby(by, sort=False, observed=True)[column] if by else ordered[column])
+    result = rolling.rolling(window, center=True, min_periods=1).median()
+    if by:
+        result = result.reset_index(level=0, drop=True)
+    return result.reindex(series.index)
+
+
+def to_dict(series: pd.DataFrame) -> dict:
+    """Série d'une ville → dict JSON (colonnes en listes, périodes ISO)."""
+    out = {"period": series["period"].dt.strftime("%Y-%m-%d").tolist()}
+    for col in series.columns.drop(["period", "city"], errors="ignore"):
+        values = series[col]
+        out[col] = values.astype(int).tolist() if col == "count" else values.round(2).tolist()
+    return out
+
+
+def from_dict(data: dict, city: str | None = None) -> pd.DataFrame:
+    """Inverse de to_dict."""
+    df = pd.DataFrame(data)
+    df["period"] = pd.to_datetime(df["period"])
+    if city is not None:
+        df.insert(0, "city", city)
+    return df
@@ -0,0 +1,227 @@
+"""
+Cache partagé entre sessions Streamlit pour la page Visualisation.
+
+Le module est importé une seule fois par le serveur : toutes les sessions
+(onglets, utilisateurs) partagent le même résumé (summary.py) et le même
+DataFrame par ville au lieu d'en garder une copie chacune dans
+st.session_state. La clé est la ville (+ colonnes) et la version des
+données brutes (storage.data_version, deux stat) :
+tant qu'aucune annonce n'a été écrite, un accès ne relance ni run() ni le
+parcours des JSON. Éviction LRU selon la mémoire occupée.
+
+Les objets renvoyés sont partagés : ne pas les modifier en place
+(df.assign / copie avant d'ajouter une colonne).
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import pandas as pd
+
+from clean_data import SeLogerDataProcessor
+from scatter_sampling import SCATTER_COLS, density_grid, downsample
+from spatial_grid import load_grid
+from storage import data_version
+from summary import load_summary, one_per_property
+from timeseries import FREQS, from_dict, smooth
+
+
+# Colonnes réellement utilisées par les graphiques (projection Parquet)
+VIZ_COLUMNS = [
+    "id", "price_m2", "livingSpace", "creation_date", "update_date", "lon", "lat", "dup_cluster"
+]
+
+
+def _nbytes(value: Any) -> int:
+    """Taille mémoire approximative d'une valeur mise en cache."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+# -------------------------------------------------------------------------
+# LRU BORNÉ EN MÉMOIRE
+# -------------------------------------------------------------------------
+
+class FrameCache:
+    """
+    LRU thread-safe {groupe: (version, valeur)} borné à `max_mb` Mo.
+
+    Une seule version est gardée par groupe : une nouvelle version remplace
+    l'ancienne. Deux sessions qui demandent la même clé en même temps ne
+    lancent qu'un seul chargement (verrou par groupe).
+    """
+
+    def __init__(self, max_mb: float = 1024) -> None:
+        self.max_bytes = int(max_mb * 2**20)
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, group: Hashable, version: Hashable):
+        with self._lock:
+            entry = self._entries.get(group)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(group)
+                self.hits += 1
+                return True, entry[1]
+            return False, None
+
+    def get_or_load(self, group: Hashable, version: Hashable, loader: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(valeur, trouvée_en_cache) ; `loader()` n'est appelé qu'en cas d'absence."""
+        found, value = self._lookup(group, version)
+        if found:
+            return value, True
+
+        with self._lock:
+            loading = self._loading.setdefault(group, threading.Lock())
+        with loading:
+            found, value = self._lookup(group, version)  # chargé entre-temps
+            if found:
+                return value, True
+            value = loader()
+            with self._lock:
+                self.misses += 1
+                self._entries[group] = (version, value, _nbytes(value))
+                self._entries.move_to_end(group)
+                self._evict()
+        return value, False
+
+    def _evict(self) -> None:
+        # garde toujours la dernière entrée, même si elle dépasse le budget seule
+        while len(self._entries) > 1 and self.size_bytes > self.max_bytes:
+            self._entries.popitem(last=False)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(nbytes for _, _, nbytes in self._entries.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_mb": round(self.size_bytes / 2**20, 1),
+                "max_mb": round(self.max_bytes / 2**20, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Instance partagée par tout le serveur (budget : VIZ_CACHE_MB, 1 Go par défaut)
+CACHE = FrameCache(float(os.environ.get("VIZ_CACHE_MB", 1024)))
+
+
+# -------------------------------------------------------------------------
+# DONNÉES D'UNE VILLE
+# -------------------------------------------------------------------------
+
+def _output_path(city: str) -> str:
+    return f"data/{city}_clean.parquet"
+
+
+def _refresh_city(city: str):
+    """run() (complet, incrémental ou rien à faire) puis lecture du résumé écrit au nettoyage."""
+    processor = SeLogerDataProcessor()
+    processor.run(city_name=city, output_path=_output_path(city), columns=["id"])
+    summary = load_summary(processor._summary_path(_output_path(city)))
+    return summary, processor.report.to_dict()
+
+
+def city_summary(city: str):
+    """
+    (résumé matérialisé — summary.py —, rapport du nettoyage, trouvé_en_cache).
+    Le nettoyage n'est relancé que si les JSON de la ville ont changé depuis
+    le dernier accès ; les annonces ne sont pas gardées en mémoire.
+    """
+    (summary, report), hit = CACHE.get_or_load(
+        ("summary", city), data_version(city), lambda: _refresh_city(city)
+    )
+    return summary, report, hit
+
+
+def city_frame(city: str, columns=VIZ_COLUMNS):
+    """
+    (DataFrame nettoyé — un bien par dup_cluster —, trouvé_en_cache), pour les
+    seuls graphiques qui ont besoin des annonces. La sortie est d'abord mise
+    à jour via city_summary (même version), puis relue avec projection.
+    """
+    columns = tuple(columns)
+    version = data_version(city)
+
+    def load():
+        city_summary(city)
+        return one_per_property(SeLogerDataProcessor().load(_output_path(city), list(columns)))
+
+    return CACHE.get_or_load(("city", city, columns), version, load)
+
+
+def city_grid(city: str) -> pd.DataFrame | None:
+    """Grille spatiale précalculée au nettoyage (spatial_grid.py), toutes mailles confondues."""
+    def load():
+        city_summary(city)
+        return load_grid(SeLogerDataProcessor._grid_path(_output_path(city)))
+
+    grid, _ = CACHE.get_or_load(("grid", city), data_version(city), load)
+    return grid
+
+
+def price_trends(cities, freq: str = "W", window: int = 3) -> pd.DataFrame:
+    """
+    Séries [city, period, count, median, q25, q75, smooth] des villes
+    demandées, lues dans les résumés (aucun calcul par annonce) et lissées
+    par médiane glissante sur `window` périodes. Clé : versions des villes.
+    """
+    cities = tuple(cities)
+
+    def load():
+        frames = [
+            from_dict(city_summary(city)[0].get(FREQS[freq], {"period": []}), city)
+            for city in cities
+        ]
+        trends = pd.concat(frames, ignore_index=True)
+        trends["smooth"] = smooth(trends, window) if len(trends) else pd.Series(dtype=float)
+        return trends
+
+    version = tuple(data_version(c) for c in cities)
+    trends, _ = CACHE.get_or_load(("trends", cities, freq, window), version, load)
+    return trends
+
+
+def _scatter_frame(cities) -> pd.DataFrame:
+    return pd.concat(
+        [city_frame(c)[0][list(SCATTER_COLS)].assign(city=c) for c in cities], ignore_index=True
+    )
+
+
+def scatter_points(cities, max_points: int):
+    """(points à tracer, infos) : tout sous `max_points`, sinon échantillon + extrêmes."""
+    cities = tuple(cities)
+    version = tuple(data_version(c) for c in cities)
+    result, _ = CACHE.get_or_load(
+        ("scatter", cities, max_points), version, lambda: downsample(_scatter_frame(cities), max_points)
+    )
+    return result
+
+
+def scatter_density(cities, bins: int = 80):
+    """Histogrammes 2D surface × prix au m² par ville (scatter_sampling.density_grid)."""
+    cities = tuple(cities)
+    version = tuple(data_version(c) for c in cities)
+    grid, _ = CACHE.get_or_load(
+        ("density", cities, bins), version, lambda: density_grid(_scatter_frame(cities), bins)
+    )
+    return grid